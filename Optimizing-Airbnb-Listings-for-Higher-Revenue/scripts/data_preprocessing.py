@@ -6,8 +6,48 @@
 import pandas as pd
 import numpy as np
 import os
+from functools import partial
 from typing import Tuple, Optional
 
+try:
+    import polars as pl
+except ImportError:  # Polars is optional; fall back to PyArrow/pandas CSV parsing
+    pl = None
+
+try:
+    import pyarrow.csv as pacsv
+except ImportError:  # PyArrow is optional; fall back to pandas CSV parsing
+    pacsv = None
+
+try:
+    import dask
+    import dask.dataframe as dd
+except ImportError:  # Dask is optional; only needed for out-of-core loading
+    dask = dd = None
+
+# Rows missing any of these are dropped during cleaning
+CRITICAL_COLUMNS = ['neighbourhood_group', 'room_type', 'price']
+
+# Numeric listing columns, parsed as floats by the Polars scan rather than inferred from its
+# first rows (a late fractional value or leading blanks would otherwise break or stringify them)
+NUMERIC_COLUMNS = [
+    'latitude', 'longitude', 'price', 'minimum_nights', 'number_of_reviews',
+    'reviews_per_month', 'calculated_host_listings_count', 'availability_365'
+]
+
+# Narrow dtypes applied after cleaning to shrink the working set
+INTEGER_DOWNCASTS = {
+    'price': 'int32',
+    'availability_365': 'int16',
+    'minimum_nights': 'int16',
+    'number_of_reviews': 'int32',
+    'calculated_host_listings_count': 'int16'
+}
+FLOAT_DOWNCASTS = {'latitude': 'float32', 'longitude': 'float32'}
+
+# Integer identifiers the downcasts leave alone (wide enough to lose digits as float64)
+ID_COLUMNS = ['id', 'host_id']
+
 def download_kaggle_dataset(dataset_name: str, output_path: str) -> bool:
     """
     Download Airbnb dataset from Kaggle
@@ -20,22 +60,17 @@ def download_kaggle_dataset(dataset_name: str, output_path: str) -> bool:
         bool: Success status
     """
     try:
-        import zipfile
+        from kaggle.api.kaggle_api_extended import KaggleApi
         
         # Create directory if it doesn't exist
         os.makedirs(output_path, exist_ok=True)
         
-        # Download dataset
-        os.system(f'kaggle datasets download -d {dataset_name} -p {output_path}')
+        # Download and extract in-process (no shell, no separate unzip pass)
+        api = KaggleApi()
+        api.authenticate()
+        api.dataset_download_files(dataset_name, path=output_path, unzip=True, quiet=False)
         
-        # Extract zip file
-        zip_path = os.path.join(output_path, f'{dataset_name.split("/")[-1]}.zip')
-        if os.path.exists(zip_path):
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(output_path)
-            return True
-        
-        return False
+        return True
     except Exception as e:
         print(f"Error downloading dataset: {e}")
         return False
@@ -54,69 +89,138 @@ def clean_airbnb_data(df: pd.DataFrame,
     Returns:
         pd.DataFrame: Cleaned dataframe
     """
-    df_clean = df.copy()
-    
-    # Remove price outliers
-    df_clean = df_clean[
-        (df_clean['price'] >= price_min) & 
-        (df_clean['price'] <= price_max)
-    ]
-    
-    # Remove rows with missing critical information
-    critical_columns = ['neighbourhood_group', 'room_type', 'price']
-    df_clean = df_clean.dropna(subset=critical_columns)
+    # Remove price outliers and rows with missing critical information in a
+    # single mask, so only the surviving rows are copied (once)
+    price = df['price'].values
+    keep = (price >= price_min) & (price <= price_max)
+    for col in CRITICAL_COLUMNS:
+        keep &= df[col].notna().values
+    df_clean = df.loc[keep].reset_index(drop=True)
     
     # Fill missing values with business logic
     df_clean['number_of_reviews'] = df_clean['number_of_reviews'].fillna(0)
     df_clean['reviews_per_month'] = df_clean['reviews_per_month'].fillna(0)
     df_clean['calculated_host_listings_count'] = df_clean['calculated_host_listings_count'].fillna(1)
     
+    # Downcast numerics (integer casts only where every value is a whole number that fits
+    # the narrow dtype; astype would silently wrap out-of-range values around)
+    for col, dtype in INTEGER_DOWNCASTS.items():
+        if col in df_clean.columns:
+            values = df_clean[col]
+            bounds = np.iinfo(dtype)
+            whole = pd.api.types.is_integer_dtype(values) or (
+                values.notna().all() and (values % 1 == 0).all()
+            )
+            if whole and (values.empty or bounds.min <= values.min() and values.max() <= bounds.max):
+                df_clean[col] = values.astype(dtype)
+    for col, dtype in FLOAT_DOWNCASTS.items():
+        if col in df_clean.columns:
+            df_clean[col] = df_clean[col].astype(dtype)
+    
+    # Low-cardinality text columns as categoricals for cheaper groupby/compare
+    for col in ['neighbourhood_group', 'neighbourhood', 'room_type']:
+        if col in df_clean.columns:
+            df_clean[col] = df_clean[col].astype('category')
+    
     return df_clean
 
-def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
+def read_csv_multithreaded(file_path: str) -> pd.DataFrame:
     """
-    Create new features for revenue analysis
+    Read a CSV with PyArrow's block-parallel multithreaded parser
     
     Args:
-        df: Cleaned Airbnb dataframe
+        file_path: Path to CSV file
         
     Returns:
-        pd.DataFrame: Feature-engineered dataframe
+        pd.DataFrame: Loaded dataframe (NumPy-backed dtypes)
     """
-    df_features = df.copy()
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=64 << 20)
+    convert_options = pacsv.ConvertOptions(strings_can_be_null=True)  # match pandas NA handling
+    return pacsv.read_csv(file_path, read_options=read_options,
+                          convert_options=convert_options).to_pandas()
+
+def scan_airbnb_csv(file_path: str, 
+                    price_min: float = 10, 
+                    price_max: float = 1000) -> pd.DataFrame:
+    """
+    Lazily scan an Airbnb CSV with Polars, pushing the cleaning filters
+    down into the reader so only surviving rows are materialized
     
-    # Revenue potential metric
-    df_features['revenue_potential'] = (
-        df_features['price'] * 
-        (365 - df_features['availability_365']) / 365
+    Args:
+        file_path: Path to Airbnb CSV file
+        price_min: Minimum realistic price
+        price_max: Maximum realistic price
+        
+    Returns:
+        pd.DataFrame: Filtered dataframe with missing values filled
+        
+    Raises:
+        pl.exceptions.ComputeError: If a column does not match its inferred type
+    """
+    lazy_df = (
+        pl.scan_csv(file_path, schema_overrides={col: pl.Float64 for col in NUMERIC_COLUMNS})
+        .filter(pl.col('price').is_between(price_min, price_max))
+        .drop_nulls(CRITICAL_COLUMNS)
+        .with_columns([
+            pl.col('number_of_reviews').fill_null(0),
+            pl.col('reviews_per_month').fill_null(0),
+            pl.col('calculated_host_listings_count').fill_null(1)
+        ])
     )
     
-    # Host type categorization
-    df_features['host_type'] = df_features['calculated_host_listings_count'].apply(
-        lambda x: 'Single Listing' if x == 1 
-        else 'Multiple Listings' if x <= 5 
-        else 'Super Host'
-    )
+    return lazy_df.collect().to_pandas()
+
+def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Create new features for revenue analysis
     
-    # Review activity categories
-    df_features['review_activity'] = pd.cut(
-        df_features['number_of_reviews'],
-        bins=[0, 0, 10, 50, float('inf')],
-        labels=['No Reviews', 'Few Reviews', 'Many Reviews', 'Highly Reviewed']
-    )
+    Args:
+        df: Cleaned Airbnb dataframe
+        
+    Returns:
+        pd.DataFrame: Feature-engineered dataframe
+    """
+    # Build all new columns first and attach them in a single assign
+    host_listings = df['calculated_host_listings_count'].values
     
-    # Availability categories
-    df_features['availability_category'] = pd.cut(
-        df_features['availability_365'],
-        bins=[0, 90, 180, 365],
-        labels=['Low Available', 'Medium Available', 'High Available']
-    )
+    # Review buckets: 0 | 1-10 | 11-50 | 51+ (missing counts stay missing)
+    reviews = df['number_of_reviews'].values.astype(float)
+    review_codes = np.where(np.isnan(reviews), -1, np.digitize(reviews, [1, 11, 51]))
     
-    # Price categories
-    df_features['price_category'] = pd.cut(
-        df_features['price'],
-        bins=[0, 75, 150, 300, float('inf')],
-        labels=['Budget', 'Mid-Range', 'Premium', 'Luxury']
+    df_features = df.assign(
+        # Revenue potential metric
+        revenue_potential=(
+            df['price'] * 
+            (365 - df['availability_365']) / 365
+        ),
+        
+        # Host type categorization
+        host_type=np.select(
+            [host_listings == 1, host_listings <= 5],
+            ['Single Listing', 'Multiple Listings'],
+            default='Super Host'
+        ),
+        
+        # Review activity categories
+        review_activity=pd.Categorical.from_codes(
+            review_codes,
+            categories=['No Reviews', 'Few Reviews', 'Many Reviews', 'Highly Reviewed'],
+            ordered=True
+        ),
+        
+        # Availability categories
+        availability_category=pd.cut(
+            df['availability_365'],
+            bins=[0, 90, 180, 365],
+            labels=['Low Available', 'Medium Available', 'High Available']
+        ),
+        
+        # Price categories
+        price_category=pd.cut(
+            df['price'],
+            bins=[0, 75, 150, 300, float('inf')],
+            labels=['Budget', 'Mid-Range', 'Premium', 'Luxury']
+        )
     )
     
     return df_features
@@ -132,40 +236,42 @@ def create_sample_data(n_samples: int = 1000, random_state: int = 42) -> pd.Data
     Returns:
         pd.DataFrame: Sample dataframe
     """
-    np.random.seed(random_state)
+    rng = np.random.default_rng(random_state)
+    listing_ids = np.arange(1, n_samples + 1)
+    host_ids = rng.integers(1, 500, n_samples)
     
     sample_data = pd.DataFrame({
-        'id': range(1, n_samples + 1),
-        'name': [f'Listing {i}' for i in range(1, n_samples + 1)],
-        'host_id': np.random.randint(1, 500, n_samples),
-        'host_name': [f'Host {i}' for i in np.random.randint(1, 500, n_samples)],
-        'neighbourhood_group': np.random.choice(
+        'id': listing_ids,
+        'name': np.char.add('Listing ', listing_ids.astype(str)),
+        'host_id': host_ids,
+        'host_name': np.char.add('Host ', rng.integers(1, 500, n_samples).astype(str)),
+        'neighbourhood_group': rng.choice(
             ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island'], 
             n_samples, 
             p=[0.3, 0.25, 0.2, 0.15, 0.1]
         ),
-        'neighbourhood': np.random.choice(
+        'neighbourhood': rng.choice(
             ['East Village', 'Williamsburg', 'Harlem', 'LES', 'Chelsea'], 
             n_samples
         ),
-        'latitude': np.random.uniform(40.5, 40.9, n_samples),
-        'longitude': np.random.uniform(-74.3, -73.7, n_samples),
-        'room_type': np.random.choice(
+        'latitude': rng.uniform(40.5, 40.9, n_samples),
+        'longitude': rng.uniform(-74.3, -73.7, n_samples),
+        'room_type': rng.choice(
             ['Entire home/apt', 'Private room', 'Shared room'], 
             n_samples, 
             p=[0.5, 0.4, 0.1]
         ),
-        'price': np.random.lognormal(4.5, 0.8, n_samples).astype(int),
-        'minimum_nights': np.random.choice(
+        'price': rng.lognormal(4.5, 0.8, n_samples).astype(int),
+        'minimum_nights': rng.choice(
             [1, 2, 3, 7, 30], 
             n_samples, 
             p=[0.3, 0.2, 0.2, 0.2, 0.1]
         ),
-        'number_of_reviews': np.random.poisson(20, n_samples),
+        'number_of_reviews': rng.poisson(20, n_samples),
         'last_review': pd.date_range('2019-01-01', '2019-12-31', periods=n_samples),
-        'reviews_per_month': np.random.uniform(0.1, 5, n_samples),
-        'calculated_host_listings_count': np.random.poisson(3, n_samples),
-        'availability_365': np.random.randint(0, 366, n_samples)
+        'reviews_per_month': rng.uniform(0.1, 5, n_samples),
+        'calculated_host_listings_count': rng.poisson(3, n_samples),
+        'availability_365': rng.integers(0, 366, n_samples)
     })
     
     return sample_data
@@ -182,7 +288,14 @@ def load_and_prepare_data(file_path: Optional[str] = None) -> pd.DataFrame:
     """
     if file_path and os.path.exists(file_path):
         print(f"Loading data from: {file_path}")
-        df = pd.read_csv(file_path)
+        df = None
+        if pl is not None:
+            try:
+                df = scan_airbnb_csv(file_path)
+            except pl.exceptions.ComputeError as e:
+                print(f"Polars could not parse the file, falling back: {str(e).splitlines()[0]}")
+        if df is None:
+            df = read_csv_multithreaded(file_path) if pacsv is not None else pd.read_csv(file_path)
     else:
         print("Creating sample data for demonstration...")
         df = create_sample_data()
@@ -194,14 +307,57 @@ def load_and_prepare_data(file_path: Optional[str] = None) -> pd.DataFrame:
     print(f"Data preparation complete! Final shape: {df_final.shape}")
     return df_final
 
+def load_and_prepare_data_parallel(file_path: str, 
+                                   price_min: float = 10, 
+                                   price_max: float = 1000, 
+                                   blocksize: str = '64MB') -> pd.DataFrame:
+    """
+    Load and prepare an Airbnb CSV that may not fit in memory, using Dask
+    to clean and engineer features independently on each partition
+    
+    Args:
+        file_path: Path (or glob) of Airbnb CSV file(s)
+        price_min: Minimum realistic price
+        price_max: Maximum realistic price
+        blocksize: Bytes of CSV per partition
+        
+    Returns:
+        pd.DataFrame: Prepared dataframe
+    """
+    if dd is None:
+        raise ImportError("load_and_prepare_data_parallel requires dask[dataframe]")
+    
+    print(f"Loading data in parallel from: {file_path}")
+    # Object strings (not Dask's default Arrow strings) to match the in-memory pipeline
+    with dask.config.set({'dataframe.convert-string': False}):
+        # assume_missing reads integers as float64; IDs are parsed as nullable ints to keep every digit
+        ddf = dd.read_csv(file_path, blocksize=blocksize, assume_missing=True,
+                          dtype={col: 'Int64' for col in ID_COLUMNS})
+        
+        # partial (not a lambda) keeps the callable picklable for distributed workers
+        clean = partial(clean_airbnb_data, price_min=price_min, price_max=price_max)
+        ddf = ddf.map_partitions(clean).map_partitions(engineer_features)
+        
+        # Partitions are re-indexed independently, so renumber the combined result
+        df_final = ddf.compute().reset_index(drop=True)
+    
+    # IDs get the dtype pandas infers in the in-memory pipeline: int64, or float64 with gaps
+    for col in ID_COLUMNS:
+        if col in df_final.columns:
+            has_gaps = df_final[col].isna().any()
+            df_final[col] = df_final[col].astype('float64' if has_gaps else 'int64')
+    
+    print(f"Data preparation complete! Final shape: {df_final.shape}")
+    return df_final
+
 if __name__ == "__main__":
     # Example usage
     data = load_and_prepare_data()
     print("\nSample of prepared data:")
     print(data.head())
     
-    # Save processed data
-    output_path = "../data/processed/airbnb_processed.csv"
+    # Save processed data (Parquet keeps category dtypes and loads without re-parsing)
+    output_path = "../data/processed/airbnb_processed.parquet"
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    data.to_csv(output_path, index=False)
+    data.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
     print(f"\nProcessed data saved to: {output_path}") 
\ No newline at end of file
@@ -10,29 +10,63 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # Set default style
 plt.style.use('default')
 sns.set_palette("husl")
 
-def create_revenue_dashboard(df: pd.DataFrame) -> plt.Figure:
+def precompute_agg(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    """
+    Compute the average-price aggregations shared by the dashboard charts
+    
+    Args:
+        df: Processed Airbnb dataframe
+        
+    Returns:
+        Dict[str, pd.Series]: Average price per group, keyed by grouping
+    """
+    reviews = df['number_of_reviews'].values.astype(float)
+    review_codes = np.where(np.isnan(reviews), -1, np.digitize(reviews, [1, 11, 51]))
+    review_bins = pd.Categorical.from_codes(review_codes, 
+                                            categories=['No Reviews', '1-10', '11-50', '50+'],
+                                            ordered=True)
+    
+    aggs = {
+        'neighbourhood_group': df.groupby('neighbourhood_group', observed=True)['price'].mean(),
+        'room_type': df.groupby('room_type', observed=True)['price'].mean(),
+        'review_bins': df.groupby(review_bins, observed=True)['price'].mean()
+    }
+    
+    # Engineered features are only present on processed data
+    for col in ['host_type', 'availability_category']:
+        if col in df.columns:
+            aggs[col] = df.groupby(col, observed=True)['price'].mean()
+    
+    return aggs
+
+def create_revenue_dashboard(df: pd.DataFrame, 
+                             aggs: Optional[Dict[str, pd.Series]] = None) -> plt.Figure:
     """
     Create comprehensive revenue visualization dashboard
     
     Args:
         df: Processed Airbnb dataframe
+        aggs: Precomputed aggregations from precompute_agg (computed if omitted)
         
     Returns:
         plt.Figure: Dashboard figure
     """
+    if aggs is None:
+        aggs = precompute_agg(df)
+    
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     fig.suptitle('🏠 Airbnb Revenue Optimization Dashboard - NYC Market Analysis', 
                  fontsize=16, fontweight='bold')
     
     # 1. Neighborhood Revenue Comparison
     ax1 = axes[0, 0]
-    neighborhood_revenue = df.groupby('neighbourhood_group')['price'].mean().sort_values(ascending=True)
+    neighborhood_revenue = aggs['neighbourhood_group'].sort_values(ascending=True)
     bars1 = ax1.barh(neighborhood_revenue.index, neighborhood_revenue.values, color='skyblue')
     ax1.set_title('💰 Average Price by Neighborhood', fontweight='bold')
     ax1.set_xlabel('Average Price ($)')
@@ -43,7 +77,7 @@ def create_revenue_dashboard(df: pd.DataFrame) -> plt.Figure:
     
     # 2. Room Type Revenue Distribution
     ax2 = axes[0, 1]
-    room_revenue = df.groupby('room_type')['price'].mean().sort_values(ascending=False)
+    room_revenue = aggs['room_type'].sort_values(ascending=False)
     bars2 = ax2.bar(room_revenue.index, room_revenue.values, 
                    color=['coral', 'lightgreen', 'gold'])
     ax2.set_title('🏠 Revenue by Property Type', fontweight='bold')
@@ -68,10 +102,7 @@ def create_revenue_dashboard(df: pd.DataFrame) -> plt.Figure:
     
     # 4. Reviews vs Revenue Relationship
     ax4 = axes[1, 1]
-    review_bins = pd.cut(df['number_of_reviews'], 
-                        bins=[0, 0, 10, 50, 200], 
-                        labels=['No Reviews', '1-10', '11-50', '50+'])
-    review_price = df.groupby(review_bins)['price'].mean()
+    review_price = aggs['review_bins']
     bars4 = ax4.bar(review_price.index, review_price.values, color='lightcoral')
     ax4.set_title('⭐ Reviews Impact on Revenue', fontweight='bold')
     ax4.set_ylabel('Average Price ($)')
@@ -99,7 +130,8 @@ def create_interactive_heatmap(df: pd.DataFrame) -> go.Figure:
         values='price',
         index='neighbourhood_group',
         columns='room_type',
-        aggfunc='mean'
+        aggfunc='mean',
+        observed=True
     ).round(0)
     
     # Create heatmap
@@ -120,18 +152,22 @@ def create_interactive_heatmap(df: pd.DataFrame) -> go.Figure:
     
     return fig
 
-def create_scatter_analysis(df: pd.DataFrame) -> go.Figure:
+def create_scatter_analysis(df: pd.DataFrame, max_points: int = 20_000) -> go.Figure:
     """
     Create interactive scatter plot for revenue analysis
     
     Args:
         df: Processed Airbnb dataframe
+        max_points: Maximum listings sent to the browser (random sample above this)
         
     Returns:
         go.Figure: Plotly scatter figure
     """
+    # Every point is serialized to JSON, so cap the payload on large frames
+    plot_df = df if len(df) <= max_points else df.sample(n=max_points, random_state=0)
+    
     fig = px.scatter(
-        df,
+        plot_df,
         x='number_of_reviews',
         y='price',
         color='neighbourhood_group',
@@ -197,21 +233,10 @@ def create_model_validation_plots(y_test: np.ndarray, y_pred: np.ndarray,
     plt.tight_layout()
     return fig
 
-def create_business_insight_charts(df: pd.DataFrame) -> Dict[str, plt.Figure]:
-    """
-    Create specific charts for business insights
-    
-    Args:
-        df: Processed Airbnb dataframe
-        
-    Returns:
-        Dict[str, plt.Figure]: Dictionary of insight charts
-    """
-    charts = {}
-    
-    # 1. Revenue by Host Type
-    fig1, ax = plt.subplots(figsize=(10, 6))
-    host_revenue = df.groupby('host_type')['price'].mean().sort_values(ascending=False)
+def _plot_host_type_revenue(df: pd.DataFrame, aggs: Dict[str, pd.Series]) -> plt.Figure:
+    """Bar chart of average price by host type"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    host_revenue = aggs['host_type'].sort_values(ascending=False)
     bars = ax.bar(host_revenue.index, host_revenue.values, color='lightblue')
     ax.set_title('👥 Revenue by Host Type', fontsize=14, fontweight='bold')
     ax.set_ylabel('Average Price ($)')
@@ -222,11 +247,12 @@ def create_business_insight_charts(df: pd.DataFrame) -> Dict[str, plt.Figure]:
         ax.text(i, v + 5, f'${v:.0f}', ha='center', fontweight='bold')
     
     plt.tight_layout()
-    charts['host_type_revenue'] = fig1
-    
-    # 2. Availability vs Price Relationship
-    fig2, ax = plt.subplots(figsize=(10, 6))
-    availability_price = df.groupby('availability_category')['price'].mean()
+    return fig
+
+def _plot_availability_revenue(df: pd.DataFrame, aggs: Dict[str, pd.Series]) -> plt.Figure:
+    """Bar chart of average price by availability category"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    availability_price = aggs['availability_category']
     bars = ax.bar(availability_price.index, availability_price.values, color='lightgreen')
     ax.set_title('📅 Availability Strategy vs Revenue', fontsize=14, fontweight='bold')
     ax.set_ylabel('Average Price ($)')
@@ -237,43 +263,97 @@ def create_business_insight_charts(df: pd.DataFrame) -> Dict[str, plt.Figure]:
         ax.text(i, v + 5, f'${v:.0f}', ha='center', fontweight='bold')
     
     plt.tight_layout()
-    charts['availability_revenue'] = fig2
-    
-    # 3. Price Category Distribution
-    fig3, ax = plt.subplots(figsize=(10, 6))
+    return fig
+
+def _plot_price_distribution(df: pd.DataFrame, aggs: Dict[str, pd.Series]) -> plt.Figure:
+    """Pie chart of listings by price category"""
+    fig, ax = plt.subplots(figsize=(10, 6))
     price_dist = df['price_category'].value_counts()
     colors = ['gold', 'lightcoral', 'lightblue', 'plum']
     wedges, texts, autotexts = ax.pie(price_dist.values, labels=price_dist.index, 
                                      autopct='%1.1f%%', colors=colors, startangle=90)
     ax.set_title('💰 Market Distribution by Price Category', fontsize=14, fontweight='bold')
+    return fig
+
+# Business insight charts, keyed by output file name
+INSIGHT_CHARTS = {
+    'host_type_revenue': _plot_host_type_revenue,
+    'availability_revenue': _plot_availability_revenue,
+    'price_distribution': _plot_price_distribution
+}
+
+# Every chart written by save_all_visualizations
+ALL_CHARTS = {'revenue_dashboard': create_revenue_dashboard, **INSIGHT_CHARTS}
+
+def create_business_insight_charts(df: pd.DataFrame, 
+                                   aggs: Optional[Dict[str, pd.Series]] = None) -> Dict[str, plt.Figure]:
+    """
+    Create specific charts for business insights
     
-    charts['price_distribution'] = fig3
+    Args:
+        df: Processed Airbnb dataframe
+        aggs: Precomputed aggregations from precompute_agg (computed if omitted)
+        
+    Returns:
+        Dict[str, plt.Figure]: Dictionary of insight charts
+    """
+    if aggs is None:
+        aggs = precompute_agg(df)
     
-    return charts
+    return {name: plot(df, aggs) for name, plot in INSIGHT_CHARTS.items()}
 
-def save_all_visualizations(df: pd.DataFrame, output_dir: str = "../dashboard/") -> None:
+def _render_chart(name: str, df: pd.DataFrame, aggs: Dict[str, pd.Series], 
+                  dpi: int = 300) -> Tuple[str, bytes]:
     """
-    Generate and save all visualizations
+    Render one chart to PNG bytes; runs inside a worker process
+    
+    Args:
+        name: Key of the chart in ALL_CHARTS
+        df: Columns of the processed dataframe the charts read
+        aggs: Precomputed aggregations from precompute_agg
+        dpi: Output resolution
+        
+    Returns:
+        Tuple[str, bytes]: Chart name and encoded PNG
+    """
+    import io
+    import matplotlib
+    matplotlib.use('Agg')  # headless rasterization in the worker
+    
+    fig = ALL_CHARTS[name](df, aggs)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return name, buffer.getvalue()
+
+def save_all_visualizations(df: pd.DataFrame, output_dir: str = "../dashboard/", 
+                            max_workers: Optional[int] = None) -> None:
+    """
+    Generate and save all visualizations, rendering charts in parallel
     
     Args:
         df: Processed Airbnb dataframe
         output_dir: Directory to save visualizations
+        max_workers: Worker processes for rendering (defaults to CPU count)
     """
     import os
+    from concurrent.futures import ProcessPoolExecutor
     os.makedirs(output_dir, exist_ok=True)
     
-    # Create and save main dashboard
-    dashboard = create_revenue_dashboard(df)
-    dashboard.savefig(f"{output_dir}/revenue_dashboard.png", dpi=300, bbox_inches='tight')
-    print(f"✅ Dashboard saved to: {output_dir}/revenue_dashboard.png")
+    # Aggregate once and share across all charts; workers only receive the
+    # small aggregates plus the columns the charts plot directly
+    aggs = precompute_agg(df)
+    chart_df = df[['price', 'price_category']]
     
-    # Create and save business insight charts
-    insight_charts = create_business_insight_charts(df)
-    for name, chart in insight_charts.items():
-        chart.savefig(f"{output_dir}/{name}.png", dpi=300, bbox_inches='tight')
-        print(f"✅ {name} chart saved to: {output_dir}/{name}.png")
-    
-    plt.close('all')  # Close all figures to free memory
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_render_chart, name, chart_df, aggs) for name in ALL_CHARTS]
+        
+        # PNG bytes are written from the main process
+        for future in futures:
+            name, png = future.result()
+            with open(f"{output_dir}/{name}.png", 'wb') as f:
+                f.write(png)
+            print(f"✅ {name} chart saved to: {output_dir}/{name}.png")
 
 if __name__ == "__main__":
     # Example usage with sample data
@@ -0,0 +1,73 @@
+# Project: Optimizing Airbnb Listings for Higher Revenue
+# Author: Roberto Candelario
+# Date: 2024-12-19
+# Description: Loader tests for CSV layouts that a few-row schema inference gets wrong
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import data_preprocessing as dp
+
+
+@pytest.fixture
+def listings():
+    """Sample listings with a fractional minimum_nights late in the file and
+    a reviews_per_month column whose first rows are empty"""
+    df = dp.create_sample_data(n_samples=3000)
+    df['minimum_nights'] = df['minimum_nights'].astype('float64')
+    df.loc[1500, 'minimum_nights'] = 1.5
+    df.loc[:150, 'reviews_per_month'] = np.nan
+    return df
+
+
+def test_scan_parses_late_float_and_leading_empty_numeric(tmp_path, listings):
+    pytest.importorskip('polars')
+    path = tmp_path / 'listings.csv'
+    listings.to_csv(path, index=False)
+
+    df = dp.scan_airbnb_csv(str(path))
+
+    assert df['minimum_nights'].dtype == np.float64
+    assert df['reviews_per_month'].dtype == np.float64
+    assert (df['minimum_nights'] == 1.5).sum() == 1
+
+
+def test_load_matches_across_readers(tmp_path, listings, monkeypatch):
+    path = tmp_path / 'listings.csv'
+    listings.to_csv(path, index=False)
+
+    df = dp.load_and_prepare_data(str(path))
+    monkeypatch.setattr(dp, 'pl', None)
+    expected = dp.load_and_prepare_data(str(path))
+
+    for col in ['minimum_nights', 'reviews_per_month', 'price', 'availability_365']:
+        assert df[col].dtype == expected[col].dtype
+        np.testing.assert_array_equal(df[col].to_numpy(), expected[col].to_numpy())
+
+
+def test_load_falls_back_when_polars_cannot_parse(tmp_path, listings):
+    pytest.importorskip('polars')
+    listings['host_id'] = listings['host_id'].astype(object)
+    listings.loc[2000, 'host_id'] = 'unknown'
+    path = tmp_path / 'listings.csv'
+    listings.to_csv(path, index=False)
+
+    df = dp.load_and_prepare_data(str(path))
+
+    assert 'unknown' in set(df['host_id'])
+
+
+def test_clean_skips_downcasts_that_would_overflow():
+    df = dp.create_sample_data(n_samples=100)
+    df.loc[0, 'minimum_nights'] = 40000
+    df.loc[0, 'price'] = 100
+
+    cleaned = dp.clean_airbnb_data(df)
+
+    assert cleaned['minimum_nights'].dtype == np.int64
+    assert cleaned['minimum_nights'].max() == 40000
+    assert cleaned['availability_365'].dtype == np.int16
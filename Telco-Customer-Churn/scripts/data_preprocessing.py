@@ -5,11 +5,70 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import polars as pl
+except ImportError:  # Polars is optional; fall back to PyArrow/pandas CSV parsing
+    pl = None
+
+try:
+    import pyarrow.csv as pacsv
+except ImportError:  # PyArrow is optional; fall back to pandas CSV parsing
+    pacsv = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; feature scores fall back to NumPy masks
+    njit = None
+
+# Low-cardinality text columns stored as pandas categoricals after cleaning
+CATEGORICAL_COLUMNS = [
+    'gender', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
+    'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+    'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract',
+    'PaperlessBilling', 'PaymentMethod', 'Churn'
+]
+
+
+def _category_code(series, value):
+    """Integer code of ``value`` in a categorical Series (-2 if absent, never matching NaN's -1)."""
+    code = series.cat.categories.get_indexer([value])[0]
+    return code if code >= 0 else -2
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _score_kernel(service_codes, yes_codes, contract, m2m_code, one_year_code,
+                      tenure, monthly, charges_75th, internet, fiber_code,
+                      payment, echeck_code, out_service_count, out_risk_score):
+        """Fill Service_Count and Risk_Score in a single parallel pass over category codes."""
+        for i in prange(tenure.shape[0]):
+            count = 0
+            for j in range(service_codes.shape[1]):
+                if service_codes[i, j] == yes_codes[j]:
+                    count += 1
+            out_service_count[i] = count
+            
+            score = 0
+            if contract[i] == m2m_code:
+                score += 3
+            elif contract[i] == one_year_code:
+                score += 1
+            if tenure[i] <= 12:
+                score += 2
+            if monthly[i] > charges_75th:
+                score += 1
+            if internet[i] == fiber_code:
+                score += 1
+            if payment[i] == echeck_code:
+                score += 1
+            out_risk_score[i] = score
+else:
+    _score_kernel = None
+
 
 class TelcoDataPreprocessor:
     """
@@ -20,9 +79,8 @@ class TelcoDataPreprocessor:
     """
     
     def __init__(self):
-        self.label_encoders = {}
+        self.label_encoders = {}  # column -> labels indexed by encoded code
         self.scaler = StandardScaler()
-        self.imputer = SimpleImputer(strategy='median')
         
     def clean_data(self, df):
         """
@@ -34,18 +92,22 @@ class TelcoDataPreprocessor:
         Returns:
             pd.DataFrame: Cleaned dataset
         """
-        df_clean = df.copy()
+        # Remove duplicates first so no work is spent on repeated rows
+        # (drop_duplicates returns a new frame; the caller's is never modified)
+        df_clean = df.drop_duplicates().reset_index(drop=True)
         
         # Fix TotalCharges data type issue (common in this dataset)
-        if df_clean['TotalCharges'].dtype == 'object':
-            df_clean['TotalCharges'] = df_clean['TotalCharges'].replace(' ', np.nan)
-            df_clean['TotalCharges'] = pd.to_numeric(df_clean['TotalCharges'])
-            
-            # Fill missing values with median
-            df_clean['TotalCharges'].fillna(df_clean['TotalCharges'].median(), inplace=True)
+        total_charges = df_clean['TotalCharges']
+        if total_charges.dtype == 'object':
+            total_charges = pd.to_numeric(total_charges.replace(' ', np.nan), errors='coerce')
+        
+        # Fill missing values with median (single assignment, no inplace on a copy)
+        df_clean['TotalCharges'] = total_charges.fillna(total_charges.median())
         
-        # Remove duplicates
-        df_clean = df_clean.drop_duplicates()
+        # Convert categorical text columns to category dtype
+        for col in CATEGORICAL_COLUMNS:
+            if col in df_clean.columns:
+                df_clean[col] = df_clean[col].astype('category')
         
         print(f"✅ Data cleaning complete. Shape: {df_clean.shape}")
         return df_clean
@@ -60,94 +122,153 @@ class TelcoDataPreprocessor:
         Returns:
             pd.DataFrame: Dataset with engineered features
         """
-        df_features = df.copy()
+        # Collect new columns and attach them to the frame in one assign
+        new_features = {}
         
         # 1. Senior citizen flag
-        df_features['Is_Senior'] = df_features['SeniorCitizen'].apply(
-            lambda x: 'Yes' if x == 1 else 'No'
+        new_features['Is_Senior'] = np.where(
+            df['SeniorCitizen'].values == 1, 'Yes', 'No'
         )
         
         # 2. Tenure groups
-        df_features['Tenure_Group'] = pd.cut(
-            df_features['tenure'], 
+        new_features['Tenure_Group'] = pd.cut(
+            df['tenure'], 
             bins=[0, 12, 24, 48, float('inf')], 
             labels=['New (0-12m)', 'Growing (13-24m)', 'Mature (25-48m)', 'Loyal (48m+)']
         )
         
         # 3. High charges indicator
-        charges_75th = df_features['MonthlyCharges'].quantile(0.75)
-        df_features['High_Charges'] = df_features['MonthlyCharges'].apply(
-            lambda x: 'Yes' if x >= charges_75th else 'No'
-        )
+        monthly_charges = df['MonthlyCharges'].values
+        charges_75th = np.nanquantile(monthly_charges, 0.75)  # partition-based, O(n); skips NaN like pandas
+        new_features['High_Charges'] = np.where(monthly_charges >= charges_75th, 'Yes', 'No')
         
         # 4. Service count
         service_cols = ['PhoneService', 'MultipleLines', 'InternetService', 
                        'OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 
                        'TechSupport', 'StreamingTV', 'StreamingMovies']
-        
-        def count_services(row):
-            count = 0
-            for col in service_cols:
-                if col in row.index and row[col] == 'Yes':
-                    count += 1
-            return count
-        
-        df_features['Service_Count'] = df_features.apply(count_services, axis=1)
+        present_service_cols = [col for col in service_cols if col in df.columns]
+        fused_scores = self._fused_scores(df, present_service_cols, charges_75th)
+        if fused_scores is not None:
+            service_count, risk_score = fused_scores
+        else:
+            service_count = (
+                (df[present_service_cols].values == 'Yes').sum(axis=1).astype('int8')
+            )
+        new_features['Service_Count'] = service_count
         
         # 5. Monthly to total ratio
-        df_features['Monthly_to_Total_Ratio'] = (
-            df_features['MonthlyCharges'] / (df_features['TotalCharges'] + 1)
+        new_features['Monthly_to_Total_Ratio'] = (
+            df['MonthlyCharges'] / (df['TotalCharges'] + 1)
         )
         
         # 6. Family status
-        df_features['Has_Partner_Dependents'] = (
-            (df_features['Partner'] == 'Yes') | (df_features['Dependents'] == 'Yes')
-        ).astype(str).replace({'True': 'Yes', 'False': 'No'})
+        has_family = (
+            (df['Partner'].values == 'Yes') | (df['Dependents'].values == 'Yes')
+        )
+        new_features['Has_Partner_Dependents'] = np.where(has_family, 'Yes', 'No')
         
         # 7. High-value internet customers
-        df_features['Internet_Plus_Streaming'] = (
-            (df_features['InternetService'] != 'No') & 
-            ((df_features['StreamingTV'] == 'Yes') | (df_features['StreamingMovies'] == 'Yes'))
-        ).astype(str).replace({'True': 'Yes', 'False': 'No'})
+        internet_streaming = (
+            (df['InternetService'].values != 'No') & 
+            ((df['StreamingTV'].values == 'Yes') | (df['StreamingMovies'].values == 'Yes'))
+        )
+        new_features['Internet_Plus_Streaming'] = np.where(internet_streaming, 'Yes', 'No')
         
-        # 8. Risk score
-        def calculate_risk_score(row):
-            score = 0
+        # 8. Risk score (computed above by the fused kernel when available,
+        # otherwise additive weights over boolean risk masks)
+        if fused_scores is None:
+            contract = df['Contract'].values
+            risk_score = np.zeros(len(df), dtype=np.int8)
             
             # Contract risk
-            if row['Contract'] == 'Month-to-month':
-                score += 3
-            elif row['Contract'] == 'One year':
-                score += 1
+            risk_score += np.where(contract == 'Month-to-month', 3,
+                                   np.where(contract == 'One year', 1, 0)).astype(np.int8)
             
             # Tenure risk
-            if row['tenure'] <= 12:
-                score += 2
+            risk_score += (df['tenure'].values <= 12).astype(np.int8) * 2
             
             # Charges risk
-            if row['MonthlyCharges'] > charges_75th:
-                score += 1
+            risk_score += (monthly_charges > charges_75th).astype(np.int8)
             
             # Internet service risk
-            if row['InternetService'] == 'Fiber optic':
-                score += 1
+            risk_score += (df['InternetService'].values == 'Fiber optic').astype(np.int8)
             
             # Payment method risk
-            if row['PaymentMethod'] == 'Electronic check':
-                score += 1
-            
-            return score
+            risk_score += (df['PaymentMethod'].values == 'Electronic check').astype(np.int8)
         
-        df_features['Risk_Score'] = df_features.apply(calculate_risk_score, axis=1)
-        df_features['Risk_Category'] = pd.cut(
-            df_features['Risk_Score'], 
+        new_features['Risk_Score'] = risk_score
+        new_features['Risk_Category'] = pd.cut(
+            risk_score, 
             bins=[-1, 2, 4, 8], 
             labels=['Low Risk', 'Medium Risk', 'High Risk']
         )
         
+        df_features = df.assign(**new_features)
+        
         print(f"✅ Feature engineering complete. New features: 9")
         return df_features
     
+    @staticmethod
+    def _fused_scores(df, service_cols, charges_75th):
+        """
+        Compute Service_Count and Risk_Score with the Numba kernel.
+        
+        Args:
+            df (pd.DataFrame): Cleaned dataset with categorical text columns
+            service_cols (list): Service columns present in df
+            charges_75th (float): MonthlyCharges high-charge threshold
+            
+        Returns:
+            tuple or None: (service_count, risk_score) int8 arrays, or None when
+            Numba is unavailable or the inputs are not categorical
+        """
+        categorical_inputs = service_cols + ['Contract', 'InternetService', 'PaymentMethod']
+        if _score_kernel is None or not service_cols or not all(
+            isinstance(df[col].dtype, pd.CategoricalDtype) for col in categorical_inputs
+        ):
+            return None
+        
+        service_codes = np.ascontiguousarray(
+            np.column_stack([df[col].cat.codes.values for col in service_cols]), dtype=np.int16
+        )
+        yes_codes = np.array([_category_code(df[col], 'Yes') for col in service_cols], dtype=np.int16)
+        
+        service_count = np.empty(len(df), dtype=np.int8)
+        risk_score = np.empty(len(df), dtype=np.int8)
+        _score_kernel(
+            service_codes, yes_codes,
+            df['Contract'].cat.codes.values,
+            _category_code(df['Contract'], 'Month-to-month'),
+            _category_code(df['Contract'], 'One year'),
+            df['tenure'].values, df['MonthlyCharges'].values, charges_75th,
+            df['InternetService'].cat.codes.values,
+            _category_code(df['InternetService'], 'Fiber optic'),
+            df['PaymentMethod'].cat.codes.values,
+            _category_code(df['PaymentMethod'], 'Electronic check'),
+            service_count, risk_score
+        )
+        return service_count, risk_score
+    
+    @staticmethod
+    def _encode_labels(series):
+        """
+        Integer-encode a categorical or text column without boxing it to str.
+        
+        Category columns reuse their existing codes; text columns go through
+        pd.factorize with sorted labels (the same codes LabelEncoder produced).
+        Missing values are encoded as -1.
+        
+        Args:
+            series (pd.Series): Column to encode
+            
+        Returns:
+            tuple: (codes, labels) where labels[code] recovers the original value
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.values.astype(np.int32), series.cat.categories
+        codes, labels = pd.factorize(series, sort=True)
+        return codes.astype(np.int32), labels
+    
     def prepare_for_modeling(self, df, target_column='Churn'):
         """
         Prepare dataset for machine learning by encoding categorical variables
@@ -158,43 +279,42 @@ class TelcoDataPreprocessor:
             target_column (str): Name of target column
             
         Returns:
-            tuple: (X_processed, y_processed, feature_names)
+            tuple: (X_processed, y_processed, feature_names) where X_processed is a
+            float32 ndarray whose columns follow feature_names
         """
-        df_model = df.copy()
-        
-        # Separate features and target
         features_to_exclude = ['customerID', target_column, 'Risk_Score']
-        feature_columns = [col for col in df_model.columns if col not in features_to_exclude]
+        feature_columns = [col for col in df.columns if col not in features_to_exclude]
+        y = df[target_column]
         
-        X = df_model[feature_columns].copy()
-        y = df_model[target_column].copy()
+        # Split features by type, keeping each column's position in feature_columns
+        numerical_features = df[feature_columns].select_dtypes(include='number').columns.tolist()
+        categorical_features = [col for col in feature_columns if col not in numerical_features]
+        position = {col: i for i, col in enumerate(feature_columns)}
         
-        # Encode categorical variables
-        categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
-        numerical_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
+        # Single float32 design matrix, filled column-for-column
+        X_processed = np.empty((len(df), len(feature_columns)), dtype=np.float32)
         
         # Label encode categorical features
         for col in categorical_features:
-            if col not in self.label_encoders:
-                self.label_encoders[col] = LabelEncoder()
-            X[col] = self.label_encoders[col].fit_transform(X[col].astype(str))
+            codes, self.label_encoders[col] = self._encode_labels(df[col])
+            X_processed[:, position[col]] = codes
         
         # Encode target variable
-        if target_column not in self.label_encoders:
-            self.label_encoders[target_column] = LabelEncoder()
-        y_encoded = self.label_encoders[target_column].fit_transform(y)
+        y_encoded, self.label_encoders[target_column] = self._encode_labels(y)
         
-        # Scale numerical features
-        X_scaled = X.copy()
+        # Scale all numerical features in one pass over a contiguous block
         if numerical_features:
-            X_scaled[numerical_features] = self.scaler.fit_transform(X[numerical_features])
+            X_num = df[numerical_features].to_numpy(dtype=np.float32)
+            X_processed[:, [position[col] for col in numerical_features]] = (
+                self.scaler.fit_transform(X_num)
+            )
         
         print(f"✅ Model preparation complete.")
         print(f"   Features: {len(feature_columns)}")
         print(f"   Categorical: {len(categorical_features)}")
         print(f"   Numerical: {len(numerical_features)}")
         
-        return X_scaled, y_encoded, feature_columns
+        return X_processed, y_encoded, feature_columns
     
     def get_feature_summary(self, df):
         """
@@ -206,44 +326,63 @@ class TelcoDataPreprocessor:
         Returns:
             pd.DataFrame: Feature summary statistics
         """
-        summary_data = []
-        
-        for column in df.columns:
-            if column != 'customerID':
-                dtype = str(df[column].dtype)
-                missing_count = df[column].isnull().sum()
-                missing_percent = (missing_count / len(df)) * 100
-                unique_count = df[column].nunique()
-                
-                if df[column].dtype in ['int64', 'float64']:
-                    stats = {
-                        'Feature': column,
-                        'Type': 'Numerical',
-                        'Missing_Count': missing_count,
-                        'Missing_Percent': missing_percent,
-                        'Unique_Values': unique_count,
-                        'Mean': df[column].mean(),
-                        'Std': df[column].std(),
-                        'Min': df[column].min(),
-                        'Max': df[column].max()
-                    }
-                else:
-                    stats = {
-                        'Feature': column,
-                        'Type': 'Categorical',
-                        'Missing_Count': missing_count,
-                        'Missing_Percent': missing_percent,
-                        'Unique_Values': unique_count,
-                        'Most_Common': df[column].mode().iloc[0] if not df[column].empty else None,
-                        'Mean': None,
-                        'Std': None,
-                        'Min': None,
-                        'Max': None
-                    }
-                
-                summary_data.append(stats)
-        
-        return pd.DataFrame(summary_data)
+        features = df.drop(columns=['customerID'], errors='ignore')
+        is_numeric = np.array([pd.api.types.is_numeric_dtype(features[col]) for col in features.columns])
+        
+        # One describe pass per dtype group instead of a reduction per statistic
+        desc = features.describe(include='all').T.reindex(
+            columns=['top', 'mean', 'std', 'min', 'max']
+        )
+        missing_count = features.isnull().sum().values
+        
+        def numeric_stat(name):
+            return np.where(is_numeric, pd.to_numeric(desc[name], errors='coerce'), np.nan)
+        
+        summary = pd.DataFrame({
+            'Feature': features.columns,
+            'Type': np.where(is_numeric, 'Numerical', 'Categorical'),
+            'Missing_Count': missing_count,
+            'Missing_Percent': (missing_count / len(df)) * 100,
+            'Unique_Values': features.nunique().values,
+            'Most_Common': desc['top'].where(~is_numeric).values,
+            'Mean': numeric_stat('mean'),
+            'Std': numeric_stat('std'),
+            'Min': numeric_stat('min'),
+            'Max': numeric_stat('max')
+        })
+        
+        return summary
+
+def read_telco_csv(file_path):
+    """
+    Read the raw Telco CSV, using a lazy Polars scan when available.
+    
+    The Polars path parses TotalCharges as numeric and drops duplicate
+    rows inside the query plan, before anything is handed to pandas.
+    Without Polars, PyArrow's multithreaded CSV parser is used instead.
+    
+    Args:
+        file_path (str): Path to the raw CSV file
+        
+    Returns:
+        pd.DataFrame: Raw Telco dataset
+    """
+    if pl is None:
+        if pacsv is None:
+            return pd.read_csv(file_path)
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=64 << 20)
+        convert_options = pacsv.ConvertOptions(strings_can_be_null=True)  # match pandas NA handling
+        return pacsv.read_csv(file_path, read_options=read_options,
+                              convert_options=convert_options).to_pandas()
+    
+    total_charges = pl.col('TotalCharges').str.strip_chars().cast(pl.Float64, strict=False)
+    lazy_df = (
+        pl.scan_csv(file_path, schema_overrides={'TotalCharges': pl.Utf8})
+        .with_columns(total_charges.alias('TotalCharges'))
+        .unique(maintain_order=True)
+    )
+    
+    return lazy_df.collect().to_pandas()
 
 
 def load_and_preprocess_data(file_path):
@@ -261,7 +400,7 @@ def load_and_preprocess_data(file_path):
     
     # Load data
     print(f"📊 Loading data from: {file_path}")
-    df_raw = pd.read_csv(file_path)
+    df_raw = read_telco_csv(file_path)
     print(f"✅ Data loaded. Shape: {df_raw.shape}")
     
     # Clean data
@@ -0,0 +1,269 @@
+# Project: Instacart 4P Analytics & Promotion Strategy
+# Author: Roberto Candelario
+# Date: 2024-12-19
+# Description: Shared load/join/feature pipeline used by every Instacart analysis script
+
+import pandas as pd
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import polars as pl
+except ImportError:  # Polars is optional; fall back to sequential pandas merges
+    pl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # PyArrow is optional; fall back to pandas CSV parsing
+    pa = pacsv = None
+
+# Raw Kaggle files the master dataset is derived from, keyed by table name
+RAW_TABLES = {
+    'orders': 'orders.csv',
+    'products': 'products.csv',
+    'order_products_prior': 'order_products__prior.csv',
+    'departments': 'departments.csv',
+    'aisles': 'aisles.csv'
+}
+RAW_FILES = list(RAW_TABLES.values())
+
+# Both sides of every merge key share these narrow dtypes so pandas never upcasts
+ID_DOWNCASTS = {
+    'order_id': 'int32',
+    'product_id': 'int32',
+    'user_id': 'int32',
+    'department_id': 'int16',
+    'aisle_id': 'int16',
+    'order_dow': 'int8',
+    'order_hour_of_day': 'int8',
+    'reordered': 'int8'
+}
+DIMENSION_CATEGORIES = ['product_name', 'department', 'aisle']
+
+# Lookup tables joined onto order_products, in join order, with their unique key
+JOIN_KEYS = {
+    'products': 'product_id',
+    'departments': 'department_id',
+    'aisles': 'aisle_id',
+    'orders': 'order_id'
+}
+
+# order_dow code -> day name lookup (Instacart encodes Sunday as 0)
+DOW_NAMES = np.array(['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'])
+
+
+def read_instacart_csv(file_path):
+    """
+    Read an Instacart CSV with PyArrow's multithreaded parser, pinning
+    the narrow ID/count dtypes at parse time
+    
+    Args:
+        file_path (str): Path to CSV file
+    
+    Returns:
+        pd.DataFrame: Loaded dataframe (NumPy-backed dtypes)
+    """
+    if pacsv is None:
+        return pd.read_csv(file_path)
+    
+    # Columns absent from a given file are simply ignored by the reader
+    convert_options = pacsv.ConvertOptions(
+        column_types={
+            'order_id': pa.int32(),
+            'product_id': pa.int32(),
+            'user_id': pa.int32(),
+            'order_dow': pa.int8(),
+            'order_hour_of_day': pa.int8(),
+            'reordered': pa.int8(),
+            'add_to_cart_order': pa.int16(),
+            'days_since_prior_order': pa.float32()
+        },
+        strings_can_be_null=True  # match pandas NA handling
+    )
+    table = pacsv.read_csv(file_path, convert_options=convert_options)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_instacart_tables(data_path='../data/raw/'):
+    """
+    Read all raw Instacart tables concurrently (the parsers release the GIL)
+    
+    Args:
+        data_path (str): Path to raw data directory
+    
+    Returns:
+        dict: Loaded dataframes keyed by table name
+    
+    Raises:
+        FileNotFoundError: If any raw file is missing
+    """
+    paths = [f'{data_path}{file_name}' for file_name in RAW_TABLES.values()]
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        return dict(zip(RAW_TABLES, executor.map(read_instacart_csv, paths)))
+
+
+def save_csv(df, file_path):
+    """
+    Write a DataFrame as CSV with PyArrow's multithreaded C++ writer
+    
+    Args:
+        df (pd.DataFrame): Data to write (index is dropped)
+        file_path (str): Output CSV path
+    """
+    if pacsv is None:
+        df.to_csv(file_path, index=False)
+    else:
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), file_path)
+
+
+def load_cached_master(cache_path, data_path='../data/raw/'):
+    """
+    Load the cached master dataset if it is newer than every raw CSV
+    
+    Args:
+        cache_path (str): Path to the master dataset cache (Arrow IPC ``.arrow``
+            file, memory-mapped, or Parquet file)
+        data_path (str): Path to raw data directory
+    
+    Returns:
+        pd.DataFrame or None: Cached master dataset, or None if missing, stale or
+            an Arrow file without PyArrow installed
+    """
+    raw_paths = [f'{data_path}{name}' for name in RAW_FILES]
+    if not os.path.exists(cache_path) or not all(os.path.exists(p) for p in raw_paths):
+        return None
+    
+    newest_raw_mtime = max(os.path.getmtime(p) for p in raw_paths)
+    if newest_raw_mtime >= os.path.getmtime(cache_path):
+        return None
+    
+    if cache_path.endswith('.arrow'):
+        if pa is None:
+            return None
+        
+        # Memory-mapped Arrow IPC: column buffers come straight from the OS page cache
+        table = pa.ipc.open_file(pa.memory_map(cache_path)).read_all()
+        master_df = table.to_pandas(split_blocks=True)
+    else:
+        master_df = pd.read_parquet(cache_path)
+    print(f"⚡ Loaded cached master dataset: {master_df.shape[0]:,} rows, {master_df.shape[1]} columns")
+    
+    return master_df
+
+
+def save_arrow_cache(df, cache_path):
+    """
+    Write a DataFrame as an uncompressed Arrow IPC file that later runs memory-map
+    
+    Args:
+        df (pd.DataFrame): Data to cache (index is dropped)
+        cache_path (str): Output ``.arrow`` path
+    
+    Returns:
+        bool: Whether the cache was written (never without PyArrow; every run then rebuilds)
+    """
+    if pa is None:
+        return False
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(cache_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return True
+
+
+def optimize_dtypes(datasets):
+    """
+    Downcast ID/count columns and convert dimension strings to categoricals
+    
+    Args:
+        datasets (dict): Dictionary of loaded datasets
+    
+    Returns:
+        dict: Datasets with narrow dtypes, ready to merge
+    """
+    optimized = {}
+    for name, df in datasets.items():
+        dtypes = {col: dtype for col, dtype in ID_DOWNCASTS.items() if col in df.columns}
+        dtypes.update({col: 'category' for col in DIMENSION_CATEGORIES if col in df.columns})
+        optimized[name] = df.astype(dtypes)
+    
+    return optimized
+
+
+def cut_codes(values, bins, include_lowest=False):
+    """
+    Right-closed bin codes equivalent to pd.cut, without building an Interval index
+    
+    Args:
+        values (np.ndarray): Values to bucket
+        bins (array-like): Ascending bin edges
+        include_lowest (bool): Whether the first interval includes its left edge
+    
+    Returns:
+        np.ndarray: Bin codes, -1 for NaN or out-of-range values
+    """
+    bins = np.asarray(bins, dtype=np.float64)
+    codes = np.searchsorted(bins, values, side='left') - 1
+    if include_lowest:
+        codes[values == bins[0]] = 0
+    codes[codes == len(bins) - 1] = -1  # above the last edge, or NaN
+    return codes
+
+
+def build_master(datasets):
+    """
+    Join the Instacart tables into the order-line master dataset, drop lines
+    without product details and add the features every analysis shares
+    (order_dow_name, basket_size)
+    
+    Args:
+        datasets (dict): Loaded tables keyed orders, products,
+            order_products_prior, departments and aisles
+    
+    Returns:
+        pd.DataFrame: Master dataset
+    """
+    # Narrow keys and dimensions before the joins so every merge hashes small ints
+    datasets = optimize_dtypes(datasets)
+    
+    if pl is not None:
+        # One fused lazy plan: the joins run in parallel and no intermediate frame is materialized
+        lazy = {name: pl.from_pandas(df).lazy() for name, df in datasets.items()}
+        plan = lazy['order_products_prior']
+        for name, key in JOIN_KEYS.items():
+            plan = plan.join(lazy[name], on=key, how='left', validate='m:1', maintain_order='left')
+        master_df = plan.collect(engine='streaming').to_pandas()
+        
+        # Polars orders categories by first appearance; restore the sorted input categories
+        for df in datasets.values():
+            for col in DIMENSION_CATEGORIES:
+                if col in df.columns:
+                    master_df[col] = master_df[col].cat.set_categories(df[col].cat.categories)
+    else:
+        # Join order_products with products, departments and aisles, then order timing/user info;
+        # every right side is indexed on its unique key, and validate guards against duplicated keys
+        master_df = datasets['order_products_prior']
+        for name, key in JOIN_KEYS.items():
+            master_df = master_df.join(datasets[name].set_index(key), on=key, how='left', validate='many_to_one')
+    
+    # Handle missing values; first orders have no prior gap
+    master_df['days_since_prior_order'] = master_df['days_since_prior_order'].fillna(0)
+    
+    # Remove any rows with missing essential information
+    initial_rows = len(master_df)
+    master_df = master_df.dropna(subset=DIMENSION_CATEGORIES)
+    if len(master_df) != initial_rows:
+        print(f"🗑️ Removed {initial_rows - len(master_df):,} rows with missing essential data")
+    
+    # Order day of week names (dow already is the category code)
+    master_df['order_dow_name'] = pd.Categorical.from_codes(
+        cut_codes(master_df['order_dow'].to_numpy(), np.arange(-1, 7)), categories=DOW_NAMES
+    )
+    
+    # Basket size per order (broadcast in place, no merge back)
+    master_df['basket_size'] = master_df.groupby('order_id', sort=False)['order_id'].transform('size')
+    
+    return master_df
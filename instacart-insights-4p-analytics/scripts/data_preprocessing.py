@@ -4,7 +4,19 @@
 # Description: Data preprocessing utilities for Instacart analysis
 
 import pandas as pd
+import numpy as np
 import os
+import sys
+
+from _pipeline import build_master, cut_codes, load_cached_master, read_instacart_tables, save_csv
+
+# Column order of the master/snacks deliverables (downstream consumers read the CSVs by position)
+MASTER_COLUMNS = [
+    'order_id', 'product_id', 'add_to_cart_order', 'reordered', 'product_name', 'aisle_id',
+    'department_id', 'department', 'aisle', 'user_id', 'eval_set', 'order_number', 'order_dow',
+    'order_hour_of_day', 'days_since_prior_order', 'synthetic_date', 'order_dow_name',
+    'hour_category', 'basket_size', 'time_period'
+]
 
 
 def load_instacart_data(data_path='../data/raw/'):
@@ -20,12 +32,8 @@ def load_instacart_data(data_path='../data/raw/'):
     datasets = {}
     
     try:
-        # Load core datasets
-        datasets['orders'] = pd.read_csv(f'{data_path}orders.csv')
-        datasets['products'] = pd.read_csv(f'{data_path}products.csv')
-        datasets['order_products_prior'] = pd.read_csv(f'{data_path}order_products__prior.csv')
-        datasets['departments'] = pd.read_csv(f'{data_path}departments.csv')
-        datasets['aisles'] = pd.read_csv(f'{data_path}aisles.csv')
+        # Load core datasets (all five files parse concurrently)
+        datasets = read_instacart_tables(data_path)
         
         print("✅ All datasets loaded successfully!")
         
@@ -48,27 +56,13 @@ def create_master_dataset(datasets):
         datasets (dict): Dictionary of loaded datasets
         
     Returns:
-        pd.DataFrame: Master dataset with all joined information
+        pd.DataFrame: Master dataset with all joined information plus
+        order_dow_name and basket_size (see _pipeline.build_master)
     """
     print("🔗 Creating master dataset...")
     
-    # Join order_products with products to get product details
-    order_products_full = datasets['order_products_prior'].merge(
-        datasets['products'], on='product_id', how='left'
-    )
-    
-    # Add department and aisle information
-    order_products_full = order_products_full.merge(
-        datasets['departments'], on='department_id', how='left'
-    )
-    order_products_full = order_products_full.merge(
-        datasets['aisles'], on='aisle_id', how='left'
-    )
-    
-    # Join with orders to get order timing and user info
-    master_df = order_products_full.merge(
-        datasets['orders'], on='order_id', how='left'
-    )
+    # Join, drop lines without product details and add the shared order features
+    master_df = build_master(datasets)
     
     print(f"✅ Master dataset created: {master_df.shape[0]:,} rows, {master_df.shape[1]} columns")
     
@@ -76,27 +70,16 @@ def create_master_dataset(datasets):
 
 def clean_data(df):
     """
-    Clean and validate the master dataset
+    Validate the master dataset (missing values are already handled by build_master)
     
     Args:
         df (pd.DataFrame): Master dataset
         
     Returns:
-        pd.DataFrame: Cleaned dataset
+        pd.DataFrame: Validated dataset
     """
     print("🧼 Cleaning data...")
     
-    # Handle missing values
-    df['days_since_prior_order'] = df['days_since_prior_order'].fillna(0)
-    
-    # Remove any rows with missing essential information
-    initial_rows = len(df)
-    df = df.dropna(subset=['product_name', 'department', 'aisle'])
-    final_rows = len(df)
-    
-    if initial_rows != final_rows:
-        print(f"🗑️ Removed {initial_rows - final_rows:,} rows with missing essential data")
-    
     # Data validation
     print("✅ Data validation:")
     print(f"   📦 Unique products: {df['product_id'].nunique():,}")
@@ -118,29 +101,28 @@ def engineer_features(df):
     """
     print("🛠️ Engineering features...")
     
-    # 1. Create synthetic date column for time series analysis
-    df['synthetic_date'] = pd.to_datetime('2017-01-01') + pd.to_timedelta(df['order_number'] // 1000, unit='D')
-    
-    # 2. Order day of week names
-    df['order_dow_name'] = df['order_dow'].map({
-        0: 'Sunday', 1: 'Monday', 2: 'Tuesday', 3: 'Wednesday', 
-        4: 'Thursday', 5: 'Friday', 6: 'Saturday'
-    })
-    
-    # 3. Order hour categories
-    df['hour_category'] = pd.cut(df['order_hour_of_day'], 
-                               bins=[0, 6, 12, 18, 24], 
-                               labels=['Night', 'Morning', 'Afternoon', 'Evening'],
-                               include_lowest=True)
-    
-    # 4. Calculate basket size per order
-    basket_size = df.groupby('order_id').size().reset_index(name='basket_size')
-    df = df.merge(basket_size, on='order_id', how='left')
+    # order_dow_name and basket_size come from build_master; the features below are inserted
+    # around them, without copying the frame, so the columns follow MASTER_COLUMNS
     
-    # 5. Create time periods for trend analysis
-    df['time_period'] = pd.cut(df['order_number'], 
-                              bins=4, 
-                              labels=['Period 1', 'Period 2', 'Period 3', 'Period 4'])
+    # 1. Create synthetic date column for time series analysis
+    # (plain datetime64 arithmetic; the ns base keeps the column at pandas' default resolution)
+    df.insert(df.columns.get_loc('order_dow_name'), 'synthetic_date',
+              np.datetime64('2017-01-01', 'ns') + (df['order_number'].to_numpy() // 1000).astype('timedelta64[D]'))
+    
+    # 2. Order hour categories
+    df.insert(df.columns.get_loc('basket_size'), 'hour_category', pd.Categorical.from_codes(
+        cut_codes(df['order_hour_of_day'].to_numpy(), [0, 6, 12, 18, 24], include_lowest=True),
+        categories=['Night', 'Morning', 'Afternoon', 'Evening'], ordered=True
+    ))
+    
+    # 3. Create time periods for trend analysis (4 equal-width bins, lowest edge nudged like pd.cut)
+    order_number = df['order_number'].to_numpy()
+    period_bins = np.linspace(np.nanmin(order_number), np.nanmax(order_number), 5)
+    period_bins[0] -= (period_bins[-1] - period_bins[0]) * 0.001
+    df['time_period'] = pd.Categorical.from_codes(
+        cut_codes(order_number, period_bins),
+        categories=['Period 1', 'Period 2', 'Period 3', 'Period 4'], ordered=True
+    )
     
     print("✅ Feature engineering completed")
     
@@ -160,7 +142,14 @@ def create_snacks_dataset(df):
     
     # Define snack categories
     snack_categories = ['snacks', 'cookies cakes', 'candy chocolate', 'chips pretzels']
-    snacks_df = df[df['department'].str.lower().isin(snack_categories)].copy()
+    department = df['department']
+    if isinstance(department.dtype, pd.CategoricalDtype):
+        # Lowercase the handful of categories once and match rows on their integer codes
+        keep_codes = np.flatnonzero(department.cat.categories.str.lower().isin(snack_categories))
+        mask = np.isin(department.cat.codes.to_numpy(), keep_codes)
+    else:
+        mask = department.str.lower().isin(snack_categories).to_numpy()
+    snacks_df = df[mask].copy()
     
     print(f"✅ Snacks dataset: {snacks_df.shape[0]:,} rows ({len(snacks_df['product_id'].unique())} unique products)")
     
@@ -178,20 +167,28 @@ def calculate_reorder_stats(df):
     """
     print("🔄 Calculating reorder statistics...")
     
-    reorder_stats = df.groupby('product_id').agg({
-        'reordered': ['sum', 'count', 'mean'],
-        'product_name': 'first',
-        'department': 'first'
-    }).round(3)
+    # Sum and count only; the rate follows in NumPy (full precision, round at display time)
+    grouped = df.groupby('product_id', observed=True)['reordered']
+    total_reorders = grouped.sum()
+    total_orders = grouped.size()
+    
+    reorder_stats = pd.DataFrame({
+        'product_id': total_reorders.index.to_numpy(),
+        'total_reorders': total_reorders.to_numpy(),
+        'total_orders': total_orders.to_numpy(),
+        'reorder_rate': total_reorders.to_numpy() / total_orders.to_numpy()
+    })
     
-    reorder_stats.columns = ['total_reorders', 'total_orders', 'reorder_rate', 'product_name', 'department']
-    reorder_stats = reorder_stats.reset_index()
+    # Attach product details from the one row per product they are constant on
+    product_details = df.drop_duplicates('product_id')[['product_id', 'product_name', 'department']]
+    reorder_stats = reorder_stats.merge(product_details, on='product_id', how='left', validate='one_to_one')
     
     print(f"✅ Reorder stats calculated for {len(reorder_stats)} products")
     
     return reorder_stats
 
-def save_processed_data(master_df, snacks_df, reorder_stats, output_path='../data/processed/'):
+def save_processed_data(master_df, snacks_df, reorder_stats, output_path='../data/processed/', write_csv=False,
+                        cached=False):
     """
     Save all processed datasets
     
@@ -200,39 +197,61 @@ def save_processed_data(master_df, snacks_df, reorder_stats, output_path='../dat
         snacks_df (pd.DataFrame): Snacks dataset
         reorder_stats (pd.DataFrame): Reorder statistics
         output_path (str): Output directory path
+        write_csv (bool): Also write the (large) master dataset as CSV
+        cached (bool): master_df was loaded from its Parquet copy, which is left as is
     """
     print("💾 Saving processed datasets...")
     
     # Create output directory if it doesn't exist
     os.makedirs(output_path, exist_ok=True)
     
-    # Save datasets
-    master_df.to_csv(f'{output_path}master_dataset.csv', index=False)
-    snacks_df.to_csv(f'{output_path}snacks_dataset.csv', index=False)
-    reorder_stats.to_csv(f'{output_path}reorder_stats.csv', index=False)
+    # Master/snacks columns in the deliverable order (a no-op unless a frame arrives reordered)
+    if list(master_df.columns) != MASTER_COLUMNS:
+        master_df, snacks_df = master_df[MASTER_COLUMNS], snacks_df[MASTER_COLUMNS]
+    
+    # Save datasets as Parquet (keeps dtypes; the master copy doubles as the rerun cache)
+    outputs = {'master_dataset': master_df, 'snacks_dataset': snacks_df, 'reorder_stats': reorder_stats}
+    for name, df in outputs.items():
+        if name == 'master_dataset' and cached:
+            continue  # its Parquet copy is the cache it was just read from
+        df.to_parquet(f'{output_path}{name}.parquet', engine='pyarrow', compression='zstd', index=False)
+    
+    # CSV copies for spreadsheet users; the large master dataset only on request
+    if not write_csv:
+        del outputs['master_dataset']
+    for name, df in outputs.items():
+        save_csv(df, f'{output_path}{name}.csv')
     
     print(f"✅ All processed datasets saved to {output_path}")
 
-def main():
+def main(write_csv=False):
     """
     Main preprocessing pipeline
+    
+    Args:
+        write_csv (bool): Also write the master dataset as CSV
     """
     print("🚀 Starting Instacart data preprocessing pipeline...")
     
-    # Load data
-    datasets = load_instacart_data()
+    # Reuse the previous run's master dataset unless the raw files changed
+    master_df = load_cached_master('../data/processed/master_dataset.parquet')
+    cached = master_df is not None
     
-    if not datasets:
-        return
-    
-    # Create master dataset
-    master_df = create_master_dataset(datasets)
-    
-    # Clean data
-    master_df = clean_data(master_df)
-    
-    # Engineer features
-    master_df = engineer_features(master_df)
+    if not cached:
+        # Load data
+        datasets = load_instacart_data()
+        
+        if not datasets:
+            return
+        
+        # Create master dataset
+        master_df = create_master_dataset(datasets)
+        
+        # Clean data
+        master_df = clean_data(master_df)
+        
+        # Engineer features
+        master_df = engineer_features(master_df)
     
     # Create snacks dataset
     snacks_df = create_snacks_dataset(master_df)
@@ -241,9 +260,9 @@ def main():
     reorder_stats = calculate_reorder_stats(master_df)
     
     # Save processed data
-    save_processed_data(master_df, snacks_df, reorder_stats)
+    save_processed_data(master_df, snacks_df, reorder_stats, write_csv=write_csv, cached=cached)
     
     print("✅ Preprocessing pipeline completed successfully!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(write_csv='--csv' in sys.argv) 
\ No newline at end of file
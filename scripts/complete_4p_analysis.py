@@ -8,11 +8,26 @@ Description: Comprehensive 4P analytics for Instacart market basket data
 
 import pandas as pd
 import numpy as np
+import sys
+import matplotlib
+if not sys.stdout.isatty():
+    matplotlib.use('Agg')  # headless run: rasterize straight to file, no GUI backend setup
 import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
 import os
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; scorecards fall back to factorize + bincount reductions
+    njit = None
+
+# The shared load/join/feature pipeline lives with the project's own scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'instacart-insights-4p-analytics', 'scripts'))
+from _pipeline import (build_master, cut_codes, load_cached_master, read_instacart_tables, save_arrow_cache,
+                       save_csv)
+
 warnings.filterwarnings('ignore')
 
 # Configure display settings
@@ -21,6 +36,58 @@ pd.set_option('display.max_rows', 100)
 plt.style.use('default')
 sns.set_palette("husl")
 
+MASTER_CACHE = '../data/processed/master_dataset.arrow'
+
+# Named aggregations shared by the 4P scorecards (the Numba kernel computes all of them in one pass)
+GROUP_STATS = {
+    'unique_orders': ('order_id', 'nunique'),
+    'total_items_sold': ('product_id', 'count'),
+    'unique_products': ('product_id', 'nunique'),
+    'unique_customers': ('user_id', 'nunique'),
+    'reorder_rate': ('reordered', 'mean'),
+    'avg_basket_size': ('basket_size', 'mean')
+}
+
+# Column layout of the row-major block fed to the scorecard kernel
+GROUP_VALUE_COLUMNS = ['order_id', 'user_id', 'product_id', 'reordered', 'basket_size']
+
+if njit is not None:
+    @njit(cache=True)
+    def _n_distinct(values):
+        """Number of distinct values in an integer array."""
+        if values.shape[0] == 0:
+            return 0
+        ordered = np.sort(values)
+        count = 1
+        for i in range(1, ordered.shape[0]):
+            if ordered[i] != ordered[i - 1]:
+                count += 1
+        return count
+    
+    @njit(parallel=True, cache=True)
+    def _group_stats_kernel(starts, values, out_unique_orders, out_unique_customers,
+                            out_unique_products, out_reorder_sum, out_basket_sum):
+        """Fill every GROUP_STATS reduction in one parallel pass over group-sorted rows.
+        
+        ``values`` is a C-contiguous (rows, 5) block laid out as GROUP_VALUE_COLUMNS.
+        """
+        for g in prange(starts.shape[0] - 1):
+            lo = starts[g]
+            hi = starts[g + 1]
+            out_unique_orders[g] = _n_distinct(values[lo:hi, 0])
+            out_unique_customers[g] = _n_distinct(values[lo:hi, 1])
+            out_unique_products[g] = _n_distinct(values[lo:hi, 2])
+            
+            reorder_sum = 0
+            basket_sum = 0
+            for i in range(lo, hi):
+                reorder_sum += values[i, 3]
+                basket_sum += values[i, 4]
+            out_reorder_sum[g] = reorder_sum
+            out_basket_sum[g] = basket_sum
+else:
+    _group_stats_kernel = None
+
 def create_directories():
     """Create necessary directories for outputs"""
     os.makedirs('../data/processed', exist_ok=True)
@@ -34,12 +101,9 @@ def load_or_simulate_data():
     data_path = '../data/raw/'
     
     try:
-        # Try to load real data
-        orders = pd.read_csv(f'{data_path}orders.csv')
-        products = pd.read_csv(f'{data_path}products.csv')
-        order_products_prior = pd.read_csv(f'{data_path}order_products__prior.csv')
-        departments = pd.read_csv(f'{data_path}departments.csv')
-        aisles = pd.read_csv(f'{data_path}aisles.csv')
+        # Try to load real data (all five files parse concurrently)
+        tables = read_instacart_tables(data_path)
+        orders, products, order_products_prior, departments, aisles = tables.values()
         
         print("✅ Real dataset loaded successfully!")
         print(f"📦 Orders: {orders.shape[0]:,} rows")
@@ -128,47 +192,123 @@ def create_master_dataset(orders, products, order_products_prior, departments, a
     """Create comprehensive dataset with feature engineering"""
     print("\n🔧 Creating master dataset with feature engineering...")
     
-    # Join datasets
-    order_products_full = order_products_prior.merge(products, on='product_id', how='left')
-    order_products_full = order_products_full.merge(departments, on='department_id', how='left')
-    order_products_full = order_products_full.merge(aisles, on='aisle_id', how='left')
-    master_df = order_products_full.merge(orders, on='order_id', how='left')
+    # Join, drop lines without product details and add order_dow_name/basket_size
+    master_df = build_master({
+        'orders': orders,
+        'products': products,
+        'order_products_prior': order_products_prior,
+        'departments': departments,
+        'aisles': aisles
+    })
     
     print(f"✅ Master dataset: {master_df.shape[0]:,} rows, {master_df.shape[1]} columns")
     
     # Feature engineering
     print("🛠️ Engineering features...")
     
-    # Day of week names
-    master_df['order_dow_name'] = master_df['order_dow'].map({
-        0: 'Sunday', 1: 'Monday', 2: 'Tuesday', 3: 'Wednesday', 
-        4: 'Thursday', 5: 'Friday', 6: 'Saturday'
-    })
-    
     # Hour categories
-    master_df['hour_category'] = pd.cut(
-        master_df['order_hour_of_day'], 
-        bins=[0, 9, 14, 19, 24], 
-        labels=['Morning', 'Midday', 'Evening', 'Night'],
-        include_lowest=True
+    master_df['hour_category'] = pd.Categorical.from_codes(
+        cut_codes(master_df['order_hour_of_day'].to_numpy(), [0, 9, 14, 19, 24], include_lowest=True),
+        categories=['Morning', 'Midday', 'Evening', 'Night'], ordered=True
     )
     
-    # Basket size
-    basket_size = master_df.groupby('order_id').size().reset_index(name='basket_size')
-    master_df = master_df.merge(basket_size, on='order_id', how='left')
-    
-    # Handle missing values
-    master_df['days_since_prior_order'] = master_df['days_since_prior_order'].fillna(0)
-    
     # Customer segmentation
-    master_df['customer_segment'] = pd.cut(
-        master_df['order_number'],
-        bins=[0, 2, 5, 10, float('inf')],
-        labels=['New', 'Occasional', 'Regular', 'VIP']
+    master_df['customer_segment'] = pd.Categorical.from_codes(
+        cut_codes(master_df['order_number'].to_numpy(), [0, 2, 5, 10, np.inf]),
+        categories=['New', 'Occasional', 'Regular', 'VIP'], ordered=True
     )
     
     return master_df
 
+def _bincount_stat(group_codes, values, func, n_groups):
+    """One GROUP_STATS reduction over dense group codes using factorize + bincount"""
+    if func == 'nunique':
+        # Count unique (group, value) pairs instead of building a set per group
+        value_codes, uniques = pd.factorize(values)
+        present = value_codes >= 0
+        pairs = np.unique(group_codes[present] * len(uniques) + value_codes[present])
+        return np.bincount(pairs // max(len(uniques), 1), minlength=n_groups)
+    
+    present = ~pd.isna(values)
+    counts = np.bincount(group_codes[present], minlength=n_groups)
+    if func == 'count':
+        return counts
+    return np.bincount(group_codes[present], weights=values[present], minlength=n_groups) / counts
+
+def _radix_argsort(codes):
+    """Stable argsort of non-negative group codes as LSD radix passes over 16-bit digits
+    (NumPy's stable sort only radix-sorts keys of 16 bits or fewer; wider keys fall back to timsort)"""
+    top = int(codes.max(initial=0))
+    order = None
+    for shift in range(0, max(top.bit_length(), 1), 16):
+        digits = codes if order is None else codes[order]
+        digits = ((digits >> shift) & 0xFFFF).astype(np.min_scalar_type(min(top >> shift, 0xFFFF)))
+        step = np.argsort(digits, kind='stable')
+        order = step if order is None else order[step]
+    return order
+
+def group_stats(master_df, keys, stats):
+    """GROUP_STATS reductions per observed group of keys, fused into one Numba pass when available"""
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    
+    # Combine the (sorted) key codes into one group code; rows with a missing key are dropped like groupby
+    group_codes = np.zeros(len(master_df), dtype=np.int64)
+    levels = []
+    for key in keys:
+        key_codes, uniques = pd.factorize(master_df[key], sort=True)
+        group_codes = np.where(key_codes < 0, -1, np.where(group_codes < 0, -1, group_codes * len(uniques) + key_codes))
+        levels.append(uniques)
+    rows = np.flatnonzero(group_codes >= 0)
+    
+    if _group_stats_kernel is None or not all(master_df[col].dtype.kind in 'iu' for col in GROUP_VALUE_COLUMNS):
+        # Vectorized fallback: dense group codes, then one bincount per requested stat
+        combos, dense_codes = np.unique(group_codes[rows], return_inverse=True)
+        columns = {}
+        for name in stats:
+            col, func = GROUP_STATS[name]
+            columns[name] = _bincount_stat(dense_codes, master_df[col].to_numpy()[rows], func, len(combos))
+    else:
+        # Sort rows by group once, in O(n) radix passes even for combined multi-key codes
+        codes = group_codes[rows]
+        order = _radix_argsort(codes)
+        rows = rows[order]
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        combos = sorted_codes[starts]
+        starts = np.append(starts, len(rows))
+        
+        # One C-contiguous row-major block, so each row's values sit next to each other in cache
+        values = np.empty((len(rows), len(GROUP_VALUE_COLUMNS)), dtype=np.int32)
+        for j, col in enumerate(GROUP_VALUE_COLUMNS):
+            values[:, j] = master_df[col].to_numpy()[rows]
+        
+        n_groups = len(combos)
+        unique_orders = np.empty(n_groups, dtype=np.int64)
+        unique_customers = np.empty(n_groups, dtype=np.int64)
+        unique_products = np.empty(n_groups, dtype=np.int64)
+        reorder_sum = np.empty(n_groups, dtype=np.int64)
+        basket_sum = np.empty(n_groups, dtype=np.int64)
+        _group_stats_kernel(starts, values, unique_orders, unique_customers, unique_products, reorder_sum, basket_sum)
+        
+        item_count = np.diff(starts)
+        columns = {
+            'unique_orders': unique_orders,
+            'total_items_sold': item_count,
+            'unique_products': unique_products,
+            'unique_customers': unique_customers,
+            'reorder_rate': reorder_sum / item_count,
+            'avg_basket_size': basket_sum / item_count
+        }
+    
+    # Decode group codes back into (sorted) key labels
+    labels = []
+    for uniques in reversed(levels):
+        combos, level_codes = np.divmod(combos, len(uniques))
+        labels.insert(0, uniques.take(level_codes))
+    index = pd.MultiIndex.from_arrays(labels, names=keys) if len(keys) > 1 else pd.Index(labels[0], name=keys[0])
+    
+    return pd.DataFrame({name: columns[name] for name in stats}, index=index)
+
 def perform_4p_analysis(master_df):
     """Comprehensive 4P analytics"""
     print("\n📈 PERFORMING 4P ANALYTICS")
@@ -178,29 +318,18 @@ def perform_4p_analysis(master_df):
     print("\n🛍️ PRODUCT PERFORMANCE ANALYSIS")
     
     # Top products
-    top_products = master_df.groupby(['product_name', 'department']).agg({
-        'order_id': 'nunique',
-        'user_id': 'nunique',
-        'reordered': 'mean'
-    }).round(3)
-    
-    top_products.columns = ['unique_orders', 'unique_customers', 'reorder_rate']
+    top_products = group_stats(master_df, ['product_name', 'department'],
+                               ['unique_orders', 'unique_customers', 'reorder_rate']).round(3)
     top_products = top_products.reset_index().sort_values('unique_orders', ascending=False)
     
     print("\n🏆 TOP 10 PRODUCTS:")
     print(top_products.head(10)[['product_name', 'department', 'unique_orders', 'reorder_rate']])
     
     # Department performance
-    dept_performance = master_df.groupby('department').agg({
-        'order_id': 'nunique',
-        'product_id': ['count', 'nunique'],
-        'user_id': 'nunique',
-        'reordered': 'mean',
-        'basket_size': 'mean'
-    }).round(3)
-    
-    dept_performance.columns = ['unique_orders', 'total_items_sold', 'unique_products', 
-                              'unique_customers', 'avg_reorder_rate', 'avg_basket_size']
+    dept_performance = group_stats(master_df, 'department', 
+                                   ['unique_orders', 'total_items_sold', 'unique_products', 
+                                    'unique_customers', 'reorder_rate', 'avg_basket_size']).round(3)
+    dept_performance = dept_performance.rename(columns={'reorder_rate': 'avg_reorder_rate'})
     dept_performance = dept_performance.reset_index().sort_values('unique_orders', ascending=False)
     
     print("\n📊 DEPARTMENT SCORECARD:")
@@ -210,39 +339,26 @@ def perform_4p_analysis(master_df):
     print("\n📅 PROMOTION TIMING ANALYSIS")
     
     # Day of week
-    dow_analysis = master_df.groupby('order_dow_name').agg({
-        'order_id': 'nunique',
-        'basket_size': 'mean',
-        'reordered': 'mean'
-    }).round(3)
-    
-    dow_analysis.columns = ['total_orders', 'avg_basket_size', 'reorder_rate']
+    dow_analysis = group_stats(master_df, 'order_dow_name', 
+                               ['unique_orders', 'avg_basket_size', 'reorder_rate']).round(3)
+    dow_analysis = dow_analysis.rename(columns={'unique_orders': 'total_orders'})
     dow_analysis = dow_analysis.sort_values('total_orders', ascending=False)
     
     print("\nBest promotion days:")
     print(dow_analysis)
     
     # Hour analysis
-    hour_analysis = master_df.groupby('order_hour_of_day').agg({
-        'order_id': 'nunique',
-        'basket_size': 'mean'
-    }).round(3)
-    
-    hour_analysis.columns = ['total_orders', 'avg_basket_size']
+    hour_analysis = group_stats(master_df, 'order_hour_of_day', ['unique_orders', 'avg_basket_size']).round(3)
+    hour_analysis = hour_analysis.rename(columns={'unique_orders': 'total_orders'})
     peak_hours = hour_analysis.nlargest(5, 'total_orders')
     print(f"\nPeak hours: {list(peak_hours.index)}")
     
     # CUSTOMER SEGMENTATION
     print("\n👥 CUSTOMER SEGMENTS")
     
-    customer_segments = master_df.groupby('customer_segment').agg({
-        'user_id': 'nunique',
-        'order_id': 'nunique',
-        'basket_size': 'mean',
-        'reordered': 'mean'
-    }).round(3)
-    
-    customer_segments.columns = ['unique_customers', 'total_orders', 'avg_basket_size', 'reorder_rate']
+    customer_segments = group_stats(master_df, 'customer_segment', 
+                                    ['unique_customers', 'unique_orders', 'avg_basket_size', 'reorder_rate']).round(3)
+    customer_segments = customer_segments.rename(columns={'unique_orders': 'total_orders'})
     print(customer_segments)
     
     return top_products, dept_performance, dow_analysis, hour_analysis, customer_segments
@@ -302,9 +418,13 @@ def create_visualizations(dept_performance, dow_analysis, hour_analysis, custome
     
     plt.tight_layout()
     plt.subplots_adjust(top=0.93)
-    plt.savefig('../reports/visualizations/4p_analytics_dashboard.png', 
-                dpi=300, bbox_inches='tight')
-    plt.show()
+    # 150 dpi PNG for screens, vector PDF for print
+    fig.savefig('../reports/visualizations/4p_analytics_dashboard.png', 
+                dpi=150, bbox_inches='tight')
+    fig.savefig('../reports/visualizations/4p_analytics_dashboard.pdf', bbox_inches='tight')
+    if sys.stdout.isatty():
+        plt.show()
+    plt.close(fig)
     
     print("💾 Dashboard saved to ../reports/visualizations/")
 
@@ -321,9 +441,11 @@ def generate_executive_summary(master_df, dept_performance, dow_analysis,
     avg_basket_size = master_df['basket_size'].mean()
     overall_reorder_rate = master_df['reordered'].mean()
     
-    # Weekend analysis
-    weekend_orders = master_df[master_df['order_dow'].isin([0, 6])]['order_id'].nunique()
-    weekday_orders = master_df[~master_df['order_dow'].isin([0, 6])]['order_id'].nunique()
+    # Weekend analysis (each order has a single dow, so flag it on its first row only)
+    first_seen = ~master_df['order_id'].duplicated().to_numpy()
+    dow = master_df['order_dow'].to_numpy()
+    weekend_orders = np.count_nonzero(first_seen & ((dow == 0) | (dow == 6)))
+    weekday_orders = total_orders - weekend_orders
     weekend_lift = ((weekend_orders - weekday_orders) / weekday_orders * 100) if weekday_orders > 0 else 0
     
     print(f"\n🎯 ANALYSIS SCOPE:")
@@ -379,8 +501,8 @@ def generate_executive_summary(master_df, dept_performance, dow_analysis,
     
     return summary_data
 
-def main():
-    """Main analysis workflow"""
+def main(write_csv=False):
+    """Main analysis workflow (pass --csv to also write the master dataset as CSV)"""
     print("🛒 INSTACART 4P ANALYTICS FRAMEWORK")
     print("=" * 50)
     print("✅ Starting comprehensive analysis...")
@@ -388,11 +510,18 @@ def main():
     # Setup
     create_directories()
     
-    # Load data
-    orders, products, order_products_prior, departments, aisles, data_source = load_or_simulate_data()
+    # Reuse the previous run's master dataset unless the raw files changed
+    master_df = load_cached_master(MASTER_CACHE)
+    cached = master_df is not None
     
-    # Create master dataset
-    master_df = create_master_dataset(orders, products, order_products_prior, departments, aisles)
+    if cached:
+        data_source = "real"  # only masters built from the raw files are ever cached
+    else:
+        # Load data
+        orders, products, order_products_prior, departments, aisles, data_source = load_or_simulate_data()
+        
+        # Create master dataset
+        master_df = create_master_dataset(orders, products, order_products_prior, departments, aisles)
     
     # Perform 4P analysis
     top_products, dept_performance, dow_analysis, hour_analysis, customer_segments = perform_4p_analysis(master_df)
@@ -404,9 +533,12 @@ def main():
     summary = generate_executive_summary(master_df, dept_performance, dow_analysis, 
                                        hour_analysis, data_source)
     
-    # Save processed data
-    master_df.to_csv('../data/processed/master_dataset.csv', index=False)
-    print("💾 Master dataset saved")
+    # Save processed data (never cache a simulated master: a later cache hit is reported as real)
+    if not cached and data_source == "real":
+        if save_arrow_cache(master_df, MASTER_CACHE):
+            print("💾 Master dataset saved")
+    if write_csv:
+        save_csv(master_df, '../data/processed/master_dataset.csv')
     
     print("\n" + "=" * 60)
     print("✅ 4P ANALYTICS COMPLETE!")
@@ -414,4 +546,4 @@ def main():
     print("📊 Analysis complete - insights and recommendations ready")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(write_csv='--csv' in sys.argv) 
\ No newline at end of file
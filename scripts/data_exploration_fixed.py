@@ -8,29 +8,30 @@ Description: Corrected version of data exploration with proper print syntax
 
 import pandas as pd
 import numpy as np
+import sys
 
 # Example with simulated data for demonstration
 def create_sample_data():
     """Create sample datasets for demonstration"""
-    np.random.seed(42)
+    rng = np.random.default_rng(42)  # local Generator: reproducible without touching global state
     
     orders = pd.DataFrame({
         'order_id': range(1, 101),
-        'user_id': np.random.randint(1, 21, 100),
-        'order_dow': np.random.randint(0, 7, 100),
-        'order_hour_of_day': np.random.randint(6, 23, 100)
+        'user_id': rng.integers(1, 21, 100),
+        'order_dow': rng.integers(0, 7, 100),
+        'order_hour_of_day': rng.integers(6, 23, 100)
     })
     
     products = pd.DataFrame({
         'product_id': range(1, 21),
         'product_name': [f'Product {i}' for i in range(1, 21)],
-        'department_id': np.random.randint(1, 6, 20)
+        'department_id': rng.integers(1, 6, 20)
     })
     
     order_products_prior = pd.DataFrame({
-        'order_id': np.random.randint(1, 101, 200),
-        'product_id': np.random.randint(1, 21, 200),
-        'reordered': np.random.choice([0, 1], 200)
+        'order_id': rng.integers(1, 101, 200),
+        'product_id': rng.integers(1, 21, 200),
+        'reordered': rng.integers(0, 2, 200)
     })
     
     departments = pd.DataFrame({
@@ -71,23 +72,17 @@ def data_exploration_corrected():
         missing = df.isnull().sum().sum()
         print(f"{name}: {missing} missing values")
     
-    # Display sample data from each dataset
-    print("\n📋 Sample Data Preview:")
-    
-    print("\n🛒 Orders Sample:")
-    print(orders.head(3))
-    
-    print("\n🛍️ Products Sample:")
-    print(products.head(3))
-    
-    print("\n📦 Order Products Sample:")
-    print(order_products_prior.head(3))
-    
-    print("\n🏪 Departments:")
-    print(departments.head())
-    
-    print("\n🚶 Aisles (sample):")
-    print(aisles.head())
+    # Display sample data from each dataset (formatted once, written in one call)
+    previews = [
+        ("🛒 Orders Sample", orders, 3),
+        ("🛍️ Products Sample", products, 3),
+        ("📦 Order Products Sample", order_products_prior, 3),
+        ("🏪 Departments", departments, 5),
+        ("🚶 Aisles (sample)", aisles, 5)
+    ]
+    sys.stdout.write("\n📋 Sample Data Preview:\n" + "".join(
+        f"\n{label}:\n{df.iloc[:n_rows].to_string(index=False)}\n" for label, df, n_rows in previews
+    ))
     # === CORRECTED CODE ENDS HERE ===
     
     print("\n✅ Data exploration completed successfully!")
@@ -121,10 +116,11 @@ if __name__ == "__main__":
     print("🛒 INSTACART DATA EXPLORATION - SYNTAX FIXED VERSION")
     print("=" * 60)
     
-    # Show the fixes
-    show_the_fix()
+    # Show the fixes (only on request; scripted runs skip the walkthrough)
+    if '--explain' in sys.argv:
+        show_the_fix()
+        print("\n" + "=" * 60)
     
-    print("\n" + "=" * 60)
     print("📊 RUNNING CORRECTED CODE:")
     
     # Run the corrected exploration
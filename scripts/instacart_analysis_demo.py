@@ -10,6 +10,24 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
 import os
+import sys
+import json
+
+try:
+    import polars as pl
+except ImportError:  # Polars is optional; fall back to pandas joins and groupbys
+    pl = None
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; distinct counts fall back to drop_duplicates row counts
+    njit = None
+
+# Shared Instacart helpers live with the project's own scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'instacart-insights-4p-analytics', 'scripts'))
+from _pipeline import (DOW_NAMES, cut_codes, load_cached_master, optimize_dtypes, read_instacart_tables,
+                       save_csv)
 
 warnings.filterwarnings('ignore')
 
@@ -19,6 +37,8 @@ pd.set_option('display.max_rows', 100)
 plt.style.use('default')
 sns.set_palette("husl")
 
+MASTER_CACHE = '../data/processed/master_dataset.parquet'
+
 # Create directories
 os.makedirs('../data/processed', exist_ok=True)
 os.makedirs('../reports/visualizations', exist_ok=True)
@@ -28,17 +48,89 @@ print("=" * 60)
 print("✅ All libraries imported successfully!")
 print("📊 Ready to begin Instacart 4P Analytics!")
 
+# Polars expressions for the pandas aggregation names used below (nulls skipped like pandas)
+POLARS_AGGS = {
+    'nunique': lambda col: pl.col(col).drop_nulls().n_unique().cast(pl.Int64),
+    'count': lambda col: pl.col(col).count().cast(pl.Int64),
+    'mean': lambda col: pl.col(col).mean(),
+    'first': lambda col: pl.col(col).drop_nulls().first()
+}
+
+def group_agg(master_df, keys, aggs):
+    """Named aggregations {name: (column, func)} per group of keys, run by Polars when available
+    
+    Matches pandas groupby(observed=True) output: NaN keys dropped, groups sorted by key.
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    if pl is None:
+        return master_df.groupby(keys, observed=True).agg(**aggs)
+    
+    columns = keys + [col for col in dict.fromkeys(col for col, _ in aggs.values()) if col not in keys]
+    result = (
+        pl.from_pandas(master_df[columns]).lazy()
+        .drop_nulls(keys)
+        .group_by(keys)
+        .agg(**{name: POLARS_AGGS[func](col) for name, (col, func) in aggs.items()})
+        .collect()
+        .to_pandas()
+    )
+    
+    # Polars orders categories by first appearance; restore the input categories before sorting
+    sources = {key: key for key in keys}
+    sources.update({name: col for name, (col, _) in aggs.items()})
+    for name, col in sources.items():
+        if isinstance(result[name].dtype, pd.CategoricalDtype):
+            result[name] = result[name].cat.set_categories(master_df[col].cat.categories)
+    
+    return result.set_index(keys).sort_index()
+
+if njit is not None:
+    @njit(cache=True)
+    def _sorted_pair_counts(group_codes, value_codes, n_groups):
+        """Distinct values per group in one scan over rows co-sorted by (group, value).
+        
+        Rows with a -1 (missing) group or value code are skipped.
+        """
+        out = np.zeros(n_groups, dtype=np.int64)
+        prev_group = -1
+        prev_value = -1
+        for i in range(group_codes.shape[0]):
+            g = group_codes[i]
+            v = value_codes[i]
+            if g >= 0 and v >= 0 and (g != prev_group or v != prev_value):
+                out[g] += 1
+            prev_group = g
+            prev_value = v
+        return out
+else:
+    _sorted_pair_counts = None
+
+def group_nunique(master_df, key, columns):
+    """Distinct non-null values of each column per group of key (groups sorted, NaN keys dropped)"""
+    if _sorted_pair_counts is None:
+        # Distinct (key, value) pairs: each group's nunique becomes a plain row count
+        counts = [group_agg(master_df[[key, col]].drop_duplicates(), key, {col: (col, 'count')}) for col in columns]
+        return pd.concat(counts, axis=1)
+    
+    group_codes, groups = pd.factorize(master_df[key], sort=True)
+    counts = {}
+    for col in columns:
+        value_codes = pd.factorize(master_df[col])[0]
+        order = np.lexsort((value_codes, group_codes))
+        counts[col] = _sorted_pair_counts(group_codes[order], value_codes[order], len(groups))
+    
+    return pd.DataFrame(counts, index=pd.Index(groups, name=key))
+
 def load_or_simulate_data():
     """Load real data or create simulated data for demonstration"""
     data_path = '../data/raw/'
     
     try:
-        # Try to load real data
-        orders = pd.read_csv(f'{data_path}orders.csv')
-        products = pd.read_csv(f'{data_path}products.csv')
-        order_products_prior = pd.read_csv(f'{data_path}order_products__prior.csv')
-        departments = pd.read_csv(f'{data_path}departments.csv')
-        aisles = pd.read_csv(f'{data_path}aisles.csv')
+        # Try to load real data (PyArrow parses all five files concurrently with typed ID columns)
+        tables = read_instacart_tables(data_path)
+        
+        # Narrow ID/count dtypes and categorical dimension strings: joins and groupbys move small ints
+        orders, products, order_products_prior, departments, aisles = optimize_dtypes(tables).values()
         
         print("✅ Real dataset loaded successfully!")
         print(f"📦 Orders: {orders.shape[0]:,} rows")
@@ -54,22 +146,25 @@ def load_or_simulate_data():
         print("📥 To use real data, download from:")
         print("   https://www.kaggle.com/datasets/psparks/instacart-market-basket-analysis")
         
-        # Create simulated datasets
-        np.random.seed(42)  # For reproducible results
+        # Create simulated datasets, drawn straight into the smallest dtypes that hold each range
+        # (both sides of every join key match)
+        rng = np.random.default_rng(42)  # For reproducible results
         
-        # Simulated orders (2000 orders)
+        # Simulated orders (2000 orders); a 0 draw (1 in 35) marks a first order with no prior gap
+        days_since_prior_order = rng.integers(0, 35, 2000).astype(np.float32)
+        days_since_prior_order[days_since_prior_order == 0] = np.nan
         orders = pd.DataFrame({
-            'order_id': range(1, 2001),
-            'user_id': np.random.randint(1, 401, 2000),
-            'order_number': np.random.randint(1, 25, 2000),
-            'order_dow': np.random.randint(0, 7, 2000),
-            'order_hour_of_day': np.random.randint(6, 23, 2000),
-            'days_since_prior_order': np.random.choice([np.nan] + list(range(1, 35)), 2000)
+            'order_id': np.arange(1, 2001, dtype=np.uint16),
+            'user_id': rng.integers(1, 401, 2000, dtype=np.uint16),
+            'order_number': rng.integers(1, 25, 2000, dtype=np.uint8),
+            'order_dow': rng.integers(0, 7, 2000, dtype=np.uint8),
+            'order_hour_of_day': rng.integers(6, 23, 2000, dtype=np.uint8),
+            'days_since_prior_order': days_since_prior_order
         })
         
         # Simulated departments
         departments = pd.DataFrame({
-            'department_id': range(1, 12),
+            'department_id': np.arange(1, 12, dtype=np.uint8),
             'department': ['snacks', 'cookies cakes', 'candy chocolate', 'chips pretzels', 
                           'beverages', 'dairy eggs', 'produce', 'meat seafood', 'bakery', 
                           'frozen', 'pantry']
@@ -77,7 +172,7 @@ def load_or_simulate_data():
         
         # Simulated aisles
         aisles = pd.DataFrame({
-            'aisle_id': range(1, 31),
+            'aisle_id': np.arange(1, 31, dtype=np.uint8),
             'aisle': [f'aisle_{i}' for i in range(1, 31)]
         })
         
@@ -92,20 +187,25 @@ def load_or_simulate_data():
         ] * 10  # Repeat to get 200 products
         
         products = pd.DataFrame({
-            'product_id': range(1, 201),
+            'product_id': np.arange(1, 201, dtype=np.uint8),
             'product_name': product_names[:200],
-            'aisle_id': np.random.randint(1, 31, 200),
-            'department_id': np.random.randint(1, 12, 200)
+            'aisle_id': rng.integers(1, 31, 200, dtype=np.uint8),
+            'department_id': rng.integers(1, 12, 200, dtype=np.uint8)
         })
         
         # Simulated order products (8000 order-product combinations)
         order_products_prior = pd.DataFrame({
-            'order_id': np.random.randint(1, 2001, 8000),
-            'product_id': np.random.randint(1, 201, 8000),
-            'add_to_cart_order': np.random.randint(1, 15, 8000),
-            'reordered': np.random.choice([0, 1], 8000, p=[0.35, 0.65])
+            'order_id': rng.integers(1, 2001, 8000, dtype=np.uint16),
+            'product_id': rng.integers(1, 201, 8000, dtype=np.uint8),
+            'add_to_cart_order': rng.integers(1, 15, 8000, dtype=np.uint8),
+            'reordered': rng.choice(np.array([0, 1], dtype=np.uint8), 8000, p=[0.35, 0.65])
         })
         
+        # Dimension strings as categoricals: joins and groupbys then move int codes, not strings
+        products['product_name'] = products['product_name'].astype('category')
+        departments['department'] = departments['department'].astype('category')
+        aisles['aisle'] = aisles['aisle'].astype('category')
+        
         print("✅ Simulated datasets created for demonstration!")
         print(f"📦 Orders: {orders.shape[0]:,} rows")
         print(f"🛍️ Products: {products.shape[0]:,} rows")
@@ -115,36 +215,60 @@ def load_or_simulate_data():
         
         return orders, products, order_products_prior, departments, aisles, False
 
-def create_master_dataset(orders, products, order_products_prior, departments, aisles):
-    """Create comprehensive dataset with feature engineering"""
+def create_master_dataset(orders, products, order_products_prior, departments, aisles, with_aisles=False):
+    """Create comprehensive dataset with feature engineering
+    
+    No analysis here reports by aisle, so the aisles join only runs with with_aisles=True.
+    """
     print("\n🔧 Creating comprehensive dataset with feature engineering...")
     
-    # Join datasets
-    order_products_full = order_products_prior.merge(products, on='product_id', how='left')
-    order_products_full = order_products_full.merge(departments, on='department_id', how='left')
-    order_products_full = order_products_full.merge(aisles, on='aisle_id', how='left')
-    master_df = order_products_full.merge(orders, on='order_id', how='left')
+    # Lookup tables joined onto the order lines, in join order: (table, unique key, columns kept).
+    # Only the columns the analyses read are carried, so every join (and streamed chunk) stays narrow
+    product_columns = ['product_name', 'department_id'] + (['aisle_id'] if with_aisles else [])
+    lookups = [(products, 'product_id', product_columns), (departments, 'department_id', ['department'])]
+    if with_aisles:
+        lookups.append((aisles, 'aisle_id', ['aisle']))
+    lookups.append((orders, 'order_id', ['user_id', 'order_dow', 'order_hour_of_day', 'days_since_prior_order']))
+    order_lines = order_products_prior[['order_id', 'product_id', 'reordered']]
+    
+    if pl is not None:
+        # One lazy plan run on the streaming engine: joins execute in bounded-memory batches
+        # without materializing intermediates
+        plan = pl.from_pandas(order_lines).lazy()
+        for table, key, columns in lookups:
+            lookup = pl.from_pandas(table[[key] + columns]).lazy()
+            plan = plan.join(lookup, on=key, how='left', validate='m:1', maintain_order='left')
+        master_df = plan.collect(engine='streaming').to_pandas()
+        
+        # Polars orders categories by first appearance; restore the sorted input categories
+        for table, _, columns in lookups:
+            for col in columns:
+                if isinstance(table[col].dtype, pd.CategoricalDtype):
+                    master_df[col] = master_df[col].cat.set_categories(table[col].cat.categories)
+    else:
+        # Join datasets (lookup tables indexed on their unique key; validate guards against duplicates)
+        master_df = order_lines
+        for table, key, columns in lookups:
+            master_df = master_df.join(table.set_index(key)[columns], on=key, how='left', validate='many_to_one')
     
     print(f"✅ Master dataset created: {master_df.shape[0]:,} rows, {master_df.shape[1]} columns")
     
     # Feature Engineering
     print("🛠️ Engineering key features...")
     
-    # Order day of week names
-    master_df['order_dow_name'] = master_df['order_dow'].map({
-        0: 'Sunday', 1: 'Monday', 2: 'Tuesday', 3: 'Wednesday', 
-        4: 'Thursday', 5: 'Friday', 6: 'Saturday'
-    })
+    # Order day of week names (dow already is the category code; orders without timing get NaN)
+    master_df['order_dow_name'] = pd.Categorical.from_codes(
+        cut_codes(master_df['order_dow'].to_numpy(), np.arange(-1, 7)), categories=DOW_NAMES
+    )
     
-    # Hour categories
-    master_df['hour_category'] = pd.cut(master_df['order_hour_of_day'], 
-                                       bins=[0, 9, 14, 19, 24], 
-                                       labels=['Morning', 'Midday', 'Evening', 'Night'],
-                                       include_lowest=True)
+    # Hour categories (same bins as pd.cut, without building an IntervalIndex)
+    master_df['hour_category'] = pd.Categorical.from_codes(
+        cut_codes(master_df['order_hour_of_day'].to_numpy(), [0, 9, 14, 19, 24], include_lowest=True),
+        categories=['Morning', 'Midday', 'Evening', 'Night'], ordered=True
+    )
     
-    # Basket size per order
-    basket_size = master_df.groupby('order_id').size().reset_index(name='basket_size')
-    master_df = master_df.merge(basket_size, on='order_id', how='left')
+    # Basket size per order (broadcast in place, no merge back)
+    master_df['basket_size'] = master_df.groupby('order_id', sort=False)['order_id'].transform('size')
     
     # Handle missing values
     master_df['days_since_prior_order'] = master_df['days_since_prior_order'].fillna(0)
@@ -159,41 +283,50 @@ def analyze_4p_performance(master_df):
     print("-" * 40)
     
     # Top Products Analysis
-    top_products = master_df.groupby(['product_name', 'department']).agg({
-        'order_id': 'nunique',
-        'user_id': 'nunique',
-        'reordered': 'mean'
+    top_products = group_agg(master_df, ['product_name', 'department'], {
+        'unique_orders': ('order_id', 'nunique'),
+        'unique_customers': ('user_id', 'nunique'),
+        'avg_reorder_rate': ('reordered', 'mean')
     }).round(3)
     
-    top_products.columns = ['unique_orders', 'unique_customers', 'avg_reorder_rate']
     top_products = top_products.reset_index().sort_values('unique_orders', ascending=False)
     
     print("\n🏆 TOP 10 PRODUCTS BY ORDER VOLUME:")
     print(top_products.head(10)[['product_name', 'department', 'unique_orders', 'unique_customers']])
     
-    # Department Performance (4P Scorecard)
-    dept_performance = master_df.groupby('department').agg({
-        'order_id': 'nunique',
-        'product_id': ['count', 'nunique'],
-        'user_id': 'nunique',
-        'reordered': 'mean',
-        'basket_size': 'mean'
-    }).round(3)
+    # Department Performance (4P Scorecard), grouped on the integer id; the name rides along
+    # as a 'first' aggregate, so strings only meet the small per-department result
+    dept_performance = group_agg(master_df, 'department_id', {
+        'department': ('department', 'first'),
+        'total_products_sold': ('product_id', 'count'),
+        'avg_reorder_rate': ('reordered', 'mean'),
+        'avg_basket_size': ('basket_size', 'mean')
+    })
+    
+    # Unique orders/products/customers from sorted (department, value) scans
+    dept_distinct = group_nunique(master_df, 'department_id', ['order_id', 'product_id', 'user_id'])
+    dept_performance.insert(1, 'unique_orders', dept_distinct['order_id'])
+    dept_performance.insert(3, 'unique_products', dept_distinct['product_id'])
+    dept_performance.insert(4, 'unique_customers', dept_distinct['user_id'])
     
-    dept_performance.columns = ['unique_orders', 'total_products_sold', 'unique_products', 
-                              'unique_customers', 'avg_reorder_rate', 'avg_basket_size']
-    dept_performance = dept_performance.reset_index().sort_values('unique_orders', ascending=False)
+    # Ids without a department name stay out of the scorecard; report by name
+    dept_performance = dept_performance.dropna(subset=['department']).set_index('department').sort_index()
+    dept_performance = dept_performance.round(3).reset_index().sort_values('unique_orders', ascending=False)
     
     print("\n📊 DEPARTMENT PERFORMANCE SUMMARY:")
     print(dept_performance.head(10))
     
     # Order Timing Analysis
     print("\n📅 ORDER TIMING INSIGHTS:")
-    dow_analysis = master_df.groupby('order_dow_name')['order_id'].nunique().sort_values(ascending=False)
+    
+    # One row per order: each order has a single day and hour, so unique orders become row counts
+    order_timing = master_df.drop_duplicates('order_id')[['order_id', 'order_dow_name', 'order_hour_of_day']]
+    dow_analysis = group_agg(order_timing, 'order_dow_name', {'order_id': ('order_id', 'count')})['order_id']
+    dow_analysis = dow_analysis.sort_values(ascending=False)
     print("Top order days:")
     print(dow_analysis)
     
-    hour_analysis = master_df.groupby('order_hour_of_day')['order_id'].nunique()
+    hour_analysis = group_agg(order_timing, 'order_hour_of_day', {'order_id': ('order_id', 'count')})['order_id']
     peak_hours = hour_analysis.nlargest(3)
     print(f"\nPeak ordering hours: {list(peak_hours.index)}")
     
@@ -213,13 +346,14 @@ def create_visualizations(dept_performance, dow_analysis, hour_analysis):
     ax1.set_xlabel('Unique Orders')
     
     # Add value labels on bars
-    for i, v in enumerate(top_depts['unique_orders']):
-        ax1.text(v + 1, i, str(v), va='center')
+    ax1.bar_label(bars1, padding=3, fontsize=9)
     
     # 2. Reorder rates
     bars2 = ax2.barh(top_depts['department'], top_depts['avg_reorder_rate'])
     ax2.set_title('Average Reorder Rate by Department', fontsize=14, fontweight='bold')
     ax2.set_xlabel('Reorder Rate')
+    ax2.bar_label(bars2, fmt='%.2f', padding=3, fontsize=9)
+    ax2.margins(x=0.08)  # room for the labels past the longest bar
     
     # 3. Day of week patterns
     bars3 = ax3.bar(dow_analysis.index, dow_analysis.values, color='skyblue')
@@ -255,9 +389,11 @@ def generate_executive_summary(master_df, dept_performance):
     print(f"🔄 Best Reorder Rate: {dept_performance['avg_reorder_rate'].max():.3f}")
     print(f"🛒 Average Basket Size: {dept_performance['avg_basket_size'].mean():.1f} items")
     
-    # Weekend analysis
-    weekend_orders = master_df[master_df['order_dow'].isin([0, 6])]['order_id'].nunique()
-    weekday_orders = master_df[~master_df['order_dow'].isin([0, 6])]['order_id'].nunique()
+    # Weekend analysis: one day code per order, all seven day counts from a single bincount
+    order_dow = master_df.drop_duplicates('order_id')['order_dow']
+    dow_counts = np.bincount(order_dow.dropna().to_numpy(dtype=np.int64), minlength=7)
+    weekend_orders = int(dow_counts[[0, 6]].sum())
+    weekday_orders = len(order_dow) - weekend_orders  # orders without a day code count as weekday, as before
     weekend_lift = ((weekend_orders - weekday_orders) / weekday_orders * 100) if weekday_orders > 0 else 0
     
     print(f"📅 Weekend vs Weekday Lift: {weekend_lift:.1f}%")
@@ -287,20 +423,26 @@ def generate_executive_summary(master_df, dept_performance):
         'weekend_lift': weekend_lift
     }
     
-    summary_df = pd.DataFrame([summary_stats])
-    summary_df.to_csv('../data/processed/executive_summary.csv', index=False)
+    # One small JSON record keeps the numeric types exact; NumPy scalars become plain ints/floats
+    with open('../data/processed/executive_summary.json', 'w') as f:
+        json.dump(summary_stats, f, indent=2, default=lambda value: value.item())
     
     return summary_stats
 
-def main():
-    """Main analysis workflow"""
+def main(write_csv=False):
+    """Main analysis workflow (pass --csv to also write the master dataset as CSV)"""
     print("🚀 Starting Instacart 4P Analytics Framework...")
     
-    # 1. Load data
-    orders, products, order_products_prior, departments, aisles, data_available = load_or_simulate_data()
+    # Reuse the previous run's master dataset unless the raw files changed
+    master_df = load_cached_master(MASTER_CACHE)
+    cached = master_df is not None
     
-    # 2. Create master dataset
-    master_df = create_master_dataset(orders, products, order_products_prior, departments, aisles)
+    if not cached:
+        # 1. Load data
+        orders, products, order_products_prior, departments, aisles, data_available = load_or_simulate_data()
+        
+        # 2. Create master dataset
+        master_df = create_master_dataset(orders, products, order_products_prior, departments, aisles)
     
     # 3. Perform 4P analysis
     top_products, dept_performance, dow_analysis, hour_analysis = analyze_4p_performance(master_df)
@@ -311,12 +453,17 @@ def main():
     # 5. Generate executive summary
     summary_stats = generate_executive_summary(master_df, dept_performance)
     
-    # 6. Save processed data
-    master_df.to_csv('../data/processed/master_dataset.csv', index=False)
-    print("💾 Master dataset saved to ../data/processed/master_dataset.csv")
+    # 6. Save processed data (Parquet keeps the categorical and narrow integer dtypes; doubles as the cache).
+    # A simulated master is never saved, or a later cache hit would pass it off as the real data
+    if not cached and data_available:
+        master_df.to_parquet(MASTER_CACHE, engine='pyarrow', compression='zstd', index=False)
+        print(f"💾 Master dataset saved to {MASTER_CACHE}")
+    if write_csv:
+        save_csv(master_df, '../data/processed/master_dataset.csv')
+        print("💾 Master dataset saved to ../data/processed/master_dataset.csv")
     
     print("\n🎉 4P Analytics Framework Complete!")
     print("📊 Ready for business presentation and strategic decisions")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(write_csv='--csv' in sys.argv) 
\ No newline at end of file